@@ -1,15 +1,66 @@
-import camelot
+import argparse
+import bisect
+import fnmatch
+import functools
+import hashlib
+import json
 import pandas as pd
 import glob
 import os
 import numpy as np
-from pdf2image import convert_from_path
-import pytesseract
 import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# The dashboard's data layer provides the location list and the output stores
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard"))
+from housing_data import LOCATION_COORDS_CSV
+from housing_index import HousingIndex
 
 MASTER_CSV = r"C:\Users\wiiga\Downloads\Toronto Project\Workbook\MLS Google - MLS.csv"
 PDF_FOLDER = "Monthly Data - PDF"
+# Spreadsheet copies of the monthly reports; preferred over the PDF for a month
+XLSX_FOLDER = "Monthly Data - XLSX"
 OUTPUT_CSV = "MLS_Google_MLS_FULL.csv"
+# Optional SQLite database (see dashboard/housing_db.py) to upsert new rows into
+OUTPUT_DB = os.environ.get("MLS_OUTPUT_DB")
+# Optional partition root (see dashboard/housing_partitions.py) to append new months to
+OUTPUT_PARTITIONS = os.environ.get("MLS_OUTPUT_PARTITIONS")
+# Optional snapshot root (see dashboard/housing_snapshots.py) to publish the new CSV to
+OUTPUT_SNAPSHOTS = os.environ.get("MLS_OUTPUT_SNAPSHOTS")
+# PDFs already ingested, so later runs only extract new or changed files
+INGEST_MANIFEST = "ingest_manifest.json"
+# Raw Camelot tables / OCR text per PDF, so cleanup changes can be re-run
+# without re-extracting; entries are keyed by PDF content and these settings
+EXTRACT_CACHE = ".extract_cache"
+CAMELOT_SETTINGS = {"flavor": "stream"}
+# Pages and table areas holding the HPI table, learnt once per PDF layout
+LAYOUT_CACHE = "pdf_layouts.json"
+# OCR fallback: render DPI and an optional page range such as "2-3"
+OCR_SETTINGS = {
+    "dpi": int(os.environ.get("MLS_OCR_DPI", "200")),
+    "pages": os.environ.get("MLS_OCR_PAGES"),
+}
+# Pages OCR'd at once per PDF; each holds one rendered page in memory
+OCR_THREADS = int(os.environ.get("MLS_OCR_THREADS", "4"))
+# Rows failing validation are appended here with a Reason instead of ingested
+REJECT_CSV = "ingest_rejects.csv"
+# Plausible values per metric kind, and the largest month-over-month change
+# of the composite Index/Benchmark (real reports stay under 0.4)
+VALUE_RANGES = {"Index": (0, 2000), "Benchmark": (0, 20_000_000), "YoYChange": (-100, 300)}
+JUMP_COLUMNS = ["CompIndex", "CompBenchmark"]
+MAX_MONTHLY_CHANGE = 0.5
+# Regions the reports cover that have no map coordinates in location_coords.csv
+REPORT_REGIONS = [
+    "All TRREB Areas",
+    "TREB Total",
+    "Barrie",
+    "Bradford West Gwillimbury",
+    "Dufferin County",
+    "Essa",
+    "Innisfil",
+]
 
 COLUMNS = [
     "Location",
@@ -32,23 +83,126 @@ COLUMNS = [
 ]
 
 expected_cols = len(COLUMNS) - 1  # exclude 'Date'
+BENCHMARK_COLUMNS = [col for col in COLUMNS if col.endswith("Benchmark")]
+# Row order of the output CSV
+SORT_COLUMNS = ["Location", "Date"]
+
+def load_latest(path):
+    """Latest Date and composite values per Location in the master.
+
+    Only those columns are read; the frame holds each location's most recent
+    row (see HousingIndex.latest_rows) and is indexed by Location.
+    """
+    master_df = pd.read_csv(path, usecols=["Location", "Date", *JUMP_COLUMNS])
+    master_df["Date"] = pd.to_datetime(master_df["Date"], errors="coerce")
+    print(f"Loaded master CSV: {master_df.shape[0]} rows")
+    return HousingIndex(master_df).latest_rows()
+
+def load_latest_db(db_path):
+    """load_latest() for the OUTPUT_DB database, creating its schema if it is new."""
+    import housing_db
+
+    conn = housing_db.connect(db_path)
+    housing_db.create_schema(conn)
+    master_df = housing_db.read_latest(conn, JUMP_COLUMNS).astype({col: "float64" for col in JUMP_COLUMNS})
+    conn.close()
+    master_df["Date"] = pd.to_datetime(master_df["Date"])
+    print(f"Loaded master database: latest rows of {master_df.shape[0]} locations")
+    return HousingIndex(master_df).latest_rows()
+
+def load_latest_partitions(root):
+    """load_latest() for the OUTPUT_PARTITIONS directory, empty if it holds no partitions yet."""
+    import housing_partitions
+
+    if housing_partitions.read_manifest(root)["partitions"]:
+        master_df = housing_partitions.read_partitions(root)[["Location", "Date", *JUMP_COLUMNS]]
+    else:
+        master_df = pd.DataFrame(columns=["Location", "Date", *JUMP_COLUMNS])
+    master_df = master_df.astype({"Date": "datetime64[ns]", **{col: "float64" for col in JUMP_COLUMNS}})
+    print(f"Loaded master partitions: {master_df.shape[0]} rows")
+    return HousingIndex(master_df).latest_rows()
+
+def read_ingest_manifest(path):
+    if not os.path.exists(path):
+        return {"files": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def remove_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+def write_json(data, path, **kwargs):
+    """Write JSON next to ``path`` and move it into place; no temp file is left on failure."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, **kwargs)
+        os.replace(tmp_path, path)
+    finally:
+        remove_file(tmp_path)
+
+def write_ingest_manifest(manifest, path):
+    write_json(manifest, path, indent=2, sort_keys=True)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-master_df = pd.read_csv(MASTER_CSV)
-master_df = master_df[COLUMNS]
-master_df["Date"] = pd.to_datetime(master_df["Date"], errors="coerce")
-print(f"Loaded master CSV: {master_df.shape[0]} rows")
+def is_ingested(entry, path):
+    """True if the manifest entry covers this exact file and it was extracted."""
+    if entry is None or entry["extractor"] == "failed":
+        return False
+    st = os.stat(path)
+    if st.st_size != entry["size"]:
+        return False
+    # Same size and mtime is trusted; a touched file is re-hashed
+    return st.st_mtime_ns == entry["mtime_ns"] or file_sha256(path) == entry["sha256"]
+
+def select_files(files, manifest, force=False, only=None):
+    """Files to extract this run: new or changed ones, or all with ``force``.
+
+    ``only`` is a list of filename patterns; matching files are extracted
+    even if unchanged and every other file is left alone.
+    """
+    if only:
+        return [
+            f for f in files
+            if any(fnmatch.fnmatch(os.path.basename(f), pattern) for pattern in only)
+        ]
+    if force:
+        return list(files)
+    return [
+        f for f in files
+        if not is_ingested(manifest["files"].get(os.path.basename(f)), f)
+    ]
+
+def manifest_entry(stats):
+    path = stats["path"]
+    st = os.stat(path)
+    return {
+        "path": path,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": stats["sha256"],
+        "extractor": stats["extractor"],
+        "date": str(stats["date"].date()),
+        "tables": stats["tables"],
+        "rows": stats["rows"],
+    }
 
 def extract_date_from_filename(path):
-    name = os.path.basename(path).replace(".pdf", "")
+    name = os.path.splitext(os.path.basename(path))[0]
     return pd.to_datetime(name, format="%B_%Y", errors="coerce")
 
-def fix_row(row):
-    lst = row.tolist()
-    if len(lst) > expected_cols:
-        lst = lst[:expected_cols]
-    elif len(lst) < expected_cols:
-        lst = lst + [None]*(expected_cols - len(lst))
-    return lst
+def fix_width(df):
+    """Truncate or pad a raw table to the schema width, all rows at once."""
+    df = df.iloc[:, :expected_cols]
+    df.columns = range(df.shape[1])
+    return df.reindex(columns=range(expected_cols))
 
 def parse_ocr_text(text, file_date):
     """Parse raw OCR text into DataFrame aligned to schema"""
@@ -63,97 +217,685 @@ def parse_ocr_text(text, file_date):
     df["Date"] = file_date
     return df
 
+NUMBER = r"\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?\s*"
+
 def clean_numeric(df):
-    """Clean numeric columns"""
-    for col in COLUMNS[1:-1]:
-        df[col] = (
-            df[col].astype(str)
-            .str.replace(r"[$,%]", "", regex=True)
-            .str.replace(",", "")
-        )
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+    """Clean numeric columns: one regex pass over all metric cells stacked together"""
+    cols = COLUMNS[1:-1]
+    cells = pd.Series(df[cols].to_numpy().ravel(), dtype="str").str.replace(r"[$,%]", "", regex=True)
+    # Casting the cells that look numeric is cheaper than to_numeric(errors="coerce")
+    values = cells.where(cells.str.fullmatch(NUMBER, na=False)).astype("float64")
+    df[cols] = values.to_numpy().reshape(len(df), len(cols))
     return df
 
-pdf_files = sorted(
-    glob.glob(os.path.join(PDF_FOLDER, "*.pdf")),
-    key=extract_date_from_filename
-)
-print(f"PDF files discovered: {len(pdf_files)}")
-if not pdf_files:
-    raise RuntimeError("❌ No PDF files found — check folder path.")
-
-new_rows = []
-files_processed = 0
-tables_processed = 0
-rows_read = 0
-rows_added = 0
-
-for file in pdf_files:
-    file_date = extract_date_from_filename(file)
-    print(f"\n📂 Processing: {os.path.basename(file)} → {file_date.date()}")
+def extraction_key(sha256):
+    """Cache key: the PDF's content hash plus a hash of the extractor settings."""
+    settings = json.dumps({"camelot": CAMELOT_SETTINGS, "ocr": OCR_SETTINGS}, sort_keys=True)
+    return f"{sha256[:16]}.{hashlib.sha256(settings.encode()).hexdigest()[:8]}"
+
+def layout_fingerprint(file):
+    """Page count, page sizes and producer, shared by reports built the same way.
 
+    Returns None if the PDF cannot be read, which forces a full scan.
+    """
     try:
-        tables = camelot.read_pdf(file, pages='all', flavor='stream')
-    except Exception as e:
-        print(f"⚠️ Camelot failed for {file}: {e}")
+        from pypdf import PdfReader  # installed with camelot
+
+        reader = PdfReader(file)
+        sizes = [[round(float(v)) for v in page.mediabox] for page in reader.pages]
+        producer = str((reader.metadata or {}).get("/Producer", ""))
+    except Exception:
+        return None
+    key = json.dumps({"sizes": sizes, "producer": producer}, sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+def read_layouts():
+    path = os.path.join(EXTRACT_CACHE, LAYOUT_CACHE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_layout(fingerprint, layout):
+    # Workers may race here; a lost entry is simply learnt again next time
+    layouts = read_layouts()
+    layouts[fingerprint] = layout
+    os.makedirs(EXTRACT_CACHE, exist_ok=True)
+    write_json(layouts, os.path.join(EXTRACT_CACHE, LAYOUT_CACHE), indent=2, sort_keys=True)
+
+@functools.cache
+def location_names():
+    """Canonical location names: location_coords.csv plus REPORT_REGIONS, whitespace-normalised."""
+    names = [*pd.read_csv(LOCATION_COORDS_CSV)["Location"], *REPORT_REGIONS]
+    return frozenset(" ".join(name.split()) for name in names)
+
+def has_benchmarks(tables):
+    """True if any raw Camelot table looks like the HPI benchmark table.
+
+    Its header must mention "Benchmark" or its rows be labelled with known
+    locations, and those rows must carry composite benchmark prices: above
+    any Index value and within VALUE_RANGES.
+    """
+    low, high = VALUE_RANGES["Index"][1], VALUE_RANGES["Benchmark"][1]
+    for rows in tables:
+        if not rows:
+            continue
+        df = clean_raw({"tables": [rows], "text": None}, pd.NaT)
+        header = any("benchmark" in str(cell).lower() for row in rows for cell in row)
+        labelled = df["Location"].str.split().str.join(" ").isin(location_names())
+        prices = df["CompBenchmark"].gt(low) & df["CompBenchmark"].le(high)
+        if (prices & (labelled | header)).any():
+            return True
+    return False
+
+def table_area(table, pad=10):
+    """A table's extent, from its column and row bounds, as a Camelot table_areas string."""
+    xs = [x for col in table.cols for x in col]
+    ys = [y for row in table.rows for y in row]
+    return f"{min(xs) - pad},{max(ys) + pad},{max(xs) + pad},{min(ys) - pad}"
+
+def read_tables(file):
+    """Camelot tables of a PDF as raw cell lists, and how they were found.
+
+    A known layout is parsed only on its table pages and areas. A new
+    layout, or a known one that no longer yields benchmarks there, is
+    scanned in full and its table pages and areas are learnt.
+    """
+    import camelot
+
+    fingerprint = layout_fingerprint(file)
+    layout = read_layouts().get(fingerprint) if fingerprint else None
+    if layout:
         tables = []
+        for page, areas in layout["pages"].items():
+            tables += camelot.read_pdf(file, pages=page, table_areas=areas, **CAMELOT_SETTINGS)
+        cells = [table.df.values.tolist() for table in tables]
+        if has_benchmarks(cells):
+            return cells, "targeted"
+
+    tables = camelot.read_pdf(file, pages="all", **CAMELOT_SETTINGS)
+    cells, pages = [], {}
+    for table in tables:
+        rows = table.df.values.tolist()
+        cells.append(rows)
+        if has_benchmarks([rows]):
+            pages.setdefault(str(table.page), []).append(table_area(table))
+    if fingerprint and pages:
+        save_layout(fingerprint, {"pages": pages})
+    return cells, "full"
+
+def ocr_pages(file):
+    """Page numbers to OCR: OCR_SETTINGS["pages"] within the PDF, or all."""
+    from pdf2image import pdfinfo_from_path
+
+    n_pages = pdfinfo_from_path(file)["Pages"]
+    if not OCR_SETTINGS["pages"]:
+        return range(1, n_pages + 1)
+    first, _, last = OCR_SETTINGS["pages"].partition("-")
+    return range(int(first), min(int(last or first), n_pages) + 1)
+
+def ocr_page(file, page):
+    """Render and OCR a single page, so only that page's image is held."""
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    image, = convert_from_path(file, dpi=OCR_SETTINGS["dpi"], first_page=page, last_page=page)
+    return pytesseract.image_to_string(image)
+
+def ocr_pdf(file):
+    """OCR text of each page in page order, yielded as soon as it is ready.
+
+    Up to OCR_THREADS pages are rendered and OCR'd at once.
+    """
+    with ThreadPoolExecutor(max_workers=OCR_THREADS) as pool:
+        yield from pool.map(functools.partial(ocr_page, file), ocr_pages(file))
+
+def extract_raw(file, on_page=None):
+    """Run the expensive part: Camelot's raw tables, or OCR text as fallback.
+
+    ``on_page`` is called with each OCR page's text as it arrives, so the
+    page can be parsed while later pages are still being OCR'd.
+    """
+    raw = {"tables": [], "layout": None, "text": None, "camelot_error": None, "ocr_error": None}
+    try:
+        raw["tables"], raw["layout"] = read_tables(file)
+    except Exception as e:
+        raw["camelot_error"] = f"⚠️ Camelot failed for {file}: {e}"
+
+    if raw["tables"]:
+        return raw
 
+    try:
+        texts = []
+        for text in ocr_pdf(file):
+            texts.append(text)
+            if on_page is not None:
+                on_page(text)
+        raw["text"] = texts
+    except Exception as e:
+        raw["ocr_error"] = f"❌ OCR failed for {file}: {e}"
+    return raw
+
+def load_raw(file, sha256, refresh=False, on_page=None):
+    """Raw extraction for a PDF from EXTRACT_CACHE, extracting on a miss.
+
+    Returns (raw, cached). Failed OCR is not cached so it is retried.
+    ``on_page`` only sees pages OCR'd now, not cached ones.
+    """
+    path = os.path.join(EXTRACT_CACHE, f"{extraction_key(sha256)}.json")
+    if not refresh and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f), True
+
+    raw = extract_raw(file, on_page)
+    if raw["ocr_error"] is None:
+        os.makedirs(EXTRACT_CACHE, exist_ok=True)
+        write_json(raw, path)
+    return raw, False
+
+def clean_raw(raw, file_date, pages=None):
+    """Align raw tables or per-page OCR text to the schema and clean the numbers.
+
+    ``pages`` are OCR pages already run through parse_ocr_text, used
+    instead of parsing raw["text"] again.
+    """
     df_list = []
-    if tables and len(tables) > 0:
-        for table in tables:
-            tables_processed += 1
-            df = table.df
-            df = df.dropna(how='all')
-            df = df[df.iloc[:,0].notna() & df.iloc[:,0].apply(lambda x: isinstance(x, str))]
-            df_fixed = df.apply(fix_row, axis=1)
-            df = pd.DataFrame(df_fixed.tolist(), columns=COLUMNS[:-1])
-            df["Date"] = file_date
-            df = clean_numeric(df)
-            df_list.append(df)
-        print(f"✅ Camelot detected {len(df_list)} tables")
+    for rows in raw["tables"]:
+        df = pd.DataFrame(rows)
+        df = df.dropna(how='all')
+        # .str.len() is only non-null for string cells
+        df = fix_width(df[df.iloc[:,0].str.len().notna()])
+        df.columns = COLUMNS[:-1]
+        df["Date"] = file_date
+        df_list.append(df)
+    if pages is None:
+        pages = [parse_ocr_text(page_text, file_date) for page_text in raw["text"] or []]
+    df_list += pages
+    if not df_list:
+        # No tables and no OCR pages, e.g. MLS_OCR_PAGES beyond the last page
+        df_list = [pd.DataFrame(columns=COLUMNS).astype({"Location": "str", "Date": "datetime64[ns]"})]
+    # Clean every table and page of the report in one batch
+    return clean_numeric(pd.concat(df_list, ignore_index=True))
+
+def extract_pdf(file, refresh=False):
+    """Extract one monthly PDF, with Camelot or the OCR fallback.
+
+    Runs in a worker process, so it prints nothing: it returns the rows (None
+    if OCR failed too) and a stats dict that the parent reports in date order.
+    """
+    file_date = extract_date_from_filename(file)
+    sha256 = file_sha256(file)
+    # Parse OCR pages as they finish rather than after the whole PDF
+    pages = []
+    raw, cached = load_raw(
+        file, sha256, refresh, on_page=lambda text: pages.append(parse_ocr_text(text, file_date))
+    )
+    if raw["tables"]:
+        extractor = "camelot"
+    else:
+        extractor = "failed" if raw["ocr_error"] else "ocr"
+    stats = {"file": os.path.basename(file), "path": file, "date": file_date,
+             "sha256": sha256, "extractor": extractor, "cached": cached,
+             "tables": len(raw["tables"]), "layout": raw.get("layout"), "rows": 0, "unparsed": 0,
+             "camelot_error": raw["camelot_error"], "ocr_error": raw["ocr_error"]}
+    if raw["ocr_error"]:
+        return None, stats
+
+    pdf_df = clean_raw(raw, file_date, None if cached else pages)
+    stats["rows"] = pdf_df.shape[0]
+    return pdf_df, stats
+
+def merge_split_tokens(cells):
+    """Re-join values the PDF-to-XLSX conversion split across cells.
+
+    "$824" ",600" becomes "$824,600" and "-0.5" "3%" becomes "-0.53%"; when
+    the split also dropped the ".0", "16" "7%" becomes "16.07%".
+    """
+    tokens = []
+    for cell in cells:
+        if tokens and cell.startswith(","):
+            tokens[-1] += cell
+        elif tokens and re.fullmatch(r"\d+%", cell) and re.fullmatch(r"-?\d+\.\d*", tokens[-1]):
+            tokens[-1] += cell
+        elif tokens and re.fullmatch(r"\d+%", cell) and re.fullmatch(r"-?\d+", tokens[-1]):
+            tokens[-1] += "." + cell.zfill(3)
+        else:
+            tokens.append(cell)
+    return tokens
+
+def split_sheet_row(values):
+    """A sheet row as (location label, [(column, text), ...] value cells)."""
+    cells = [(col, " ".join(v.split())) for col, v in enumerate(values) if isinstance(v, str) and v.strip()]
+    label = []
+    while cells and not re.match(r"[-$\d.]", cells[0][1]):
+        label.append(cells.pop(0)[1])
+    return " ".join(label), cells
+
+def group_anchors(rows):
+    """First column of each property type's Index, learnt from complete rows.
+
+    Rows missing a property type simply lack its cells, so values can only
+    be assigned to a type by column; the columns are taken from the rows
+    that have all 15 values.
+    """
+    n_values = len(COLUMNS[1:-1])
+    starts = [{} for _ in range(n_values // 3)]
+    for _, cells in rows:
+        tokens, token_cols = [], []
+        for col, text in cells:
+            merged = merge_split_tokens(tokens + [text])
+            if len(merged) > len(tokens):
+                token_cols.append(col)
+            tokens = merged
+        if len(tokens) == n_values:
+            for group, counts in enumerate(starts):
+                col = token_cols[3 * group]
+                counts[col] = counts.get(col, 0) + 1
+    if not starts[0]:
+        return None
+    return [max(counts, key=counts.get) for counts in starts]
+
+def parse_group(cells):
+    """Index, Benchmark and YoY of one property type, told apart by format.
+
+    Returns None if the cells cannot be read as one value of each kind.
+    """
+    values = [None, None, None]
+    for token in merge_split_tokens(cells):
+        if token == "-":
+            continue
+        if token.endswith("%"):
+            slot = 2
+        elif token.startswith("$") or "," in token:
+            slot = 1
+        else:
+            slot = 0
+        if values[slot] is not None:
+            return None
+        values[slot] = token
+    return values
+
+def parse_sheet(df):
+    """Rows of one report sheet aligned to COLUMNS[:-1], and the rows skipped."""
+    rows = [split_sheet_row(values) for values in df.itertuples(index=False)]
+    rows = [(label, cells) for label, cells in rows if label and cells]
+    anchors = group_anchors(rows)
+    if anchors is None:
+        return [], 0
+
+    parsed, unparsed = [], 0
+    bounds = list(zip(anchors, anchors[1:] + [len(df.columns)]))
+    for label, cells in rows:
+        groups = [parse_group([text for col, text in cells if lo <= col < hi]) for lo, hi in bounds]
+        # Page numbers and footers have no complete Index + Benchmark pair
+        if None in groups or not any(g[0] and g[1] for g in groups):
+            unparsed += 1
+            continue
+        parsed.append([label] + [value for group in groups for value in group])
+    return parsed, unparsed
+
+def extract_xlsx(file):
+    """Read one monthly workbook onto the COLUMNS schema (no Camelot or OCR)."""
+    file_date = extract_date_from_filename(file)
+    rows, unparsed = [], 0
+    for sheet in pd.read_excel(file, sheet_name=None, header=None, dtype=str).values():
+        sheet_rows, sheet_unparsed = parse_sheet(sheet)
+        rows += sheet_rows
+        unparsed += sheet_unparsed
+
+    df = pd.DataFrame(rows, columns=COLUMNS[:-1])
+    df["Date"] = file_date
+    df = clean_numeric(df)
+    stats = {"file": os.path.basename(file), "path": file, "date": file_date,
+             "sha256": file_sha256(file), "extractor": "xlsx", "cached": False,
+             "tables": 0, "layout": None, "rows": df.shape[0], "unparsed": unparsed,
+             "camelot_error": None, "ocr_error": None}
+    return df, stats
+
+def canonical_locations(df, known):
+    """Map labels split or squashed by the XLSX conversion onto known names.
+
+    "HaltonRegion" and "Adjala-Tos orontio" match on letters alone; labels
+    not in ``known`` fall back to a spaced spelling seen elsewhere in ``df``,
+    then to splitting CamelCase ("AllTRREBAreas" → "All TRREB Areas").
+    """
+    def squash(name):
+        return re.sub(r"\s+", "", name).lower()
+
+    def unsquash(name):
+        words = re.sub(r"(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])", " ", name).split()
+        return " ".join(words) if len(words) > 1 and min(map(len, words)) >= 3 else name
+
+    spaced = df.loc[df["Location"].str.contains(" "), "Location"]
+    by_key = {squash(name): name for name in spaced}
+    by_key.update({squash(name): name for name in known})
+    key = df["Location"].map(squash)
+    return df.assign(Location=key.map(by_key).fillna(df["Location"].map(unsquash)))
+
+def discover_files():
+    """Monthly files in date order: the XLSX where there is one, else the PDF."""
+    xlsx_files = glob.glob(os.path.join(XLSX_FOLDER, "*.xlsx"))
+    xlsx_dates = {extract_date_from_filename(f) for f in xlsx_files}
+    pdf_files = [
+        f for f in glob.glob(os.path.join(PDF_FOLDER, "*.pdf"))
+        if extract_date_from_filename(f) not in xlsx_dates
+    ]
+    return sorted(xlsx_files + pdf_files, key=extract_date_from_filename)
+
+def extract_file(file, refresh=False):
+    if file.endswith(".xlsx"):
+        return extract_xlsx(file)
+    return extract_pdf(file, refresh)
+
+def print_file_stats(stats):
+    cached = " (cached extraction)" if stats["cached"] else ""
+    print(f"\n📂 Processing: {stats['file']} → {stats['date'].date()}{cached}")
+    if stats["extractor"] == "xlsx":
+        print(f"✅ Read {stats['rows']} rows from the spreadsheet ({stats['unparsed']} unreadable rows skipped)")
+        return
+    if stats["camelot_error"]:
+        print(stats["camelot_error"])
+    if stats["extractor"] == "camelot":
+        scope = " on the known table pages" if stats["layout"] == "targeted" else ""
+        print(f"✅ Camelot detected {stats['tables']} tables{scope}")
     else:
         print("⚠️ No tables detected with Camelot, using OCR fallback")
-        try:
-            pages = convert_from_path(file)
-            ocr_text = ""
-            for page in pages:
-                ocr_text += pytesseract.image_to_string(page) + "\n"
-            df = parse_ocr_text(ocr_text, file_date)
-            df = clean_numeric(df)
-            df_list.append(df)
-        except Exception as e:
-            print(f"❌ OCR failed for {file}: {e}")
+    if stats["ocr_error"]:
+        print(stats["ocr_error"])
+
+def extract_files(files, workers=1, refresh=False):
+    """Extract every monthly file, in a process pool when workers > 1.
+
+    Results come back in the order of ``files`` (date order) whatever
+    order the workers finish in, so the merge is deterministic.
+    """
+    extract = functools.partial(extract_file, refresh=refresh)
+    if workers <= 1:
+        yield from map(extract, files)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(extract, files)
+
+def select_new_rows(extracted, last_dates):
+    """Split extracted rows into rows newer than the master and skipped rows.
+
+    A row is new if its Location has no dated rows in the master yet, or its
+    Date is after that location's last date. Skipped rows get a Reason.
+    """
+    last = pd.Series(last_dates.reindex(extracted["Location"]).to_numpy(), index=extracted.index)
+    is_new = last.isna() | (extracted["Date"] > last)
+
+    skipped = extracted[~is_new].copy()
+    skipped["Reason"] = np.where(
+        skipped["Date"] == last[~is_new],
+        "month already in master",
+        "older than the location's last date",
+    )
+    return extracted[is_new], skipped
+
+def print_skip_report(skip_counts):
+    if not skip_counts:
+        return
+    print("\nRows skipped (already covered by the master):")
+    for (date, reason), count in sorted(skip_counts.items()):
+        print(f"  {date}: {count} rows, {reason}")
+
+def read_reports(files, workers, refresh, entries, totals):
+    """Extract stage: log each file and yield its rows, one report at a time."""
+    for file_df, stats in extract_files(files, workers, refresh):
+        print_file_stats(stats)
+        entries[stats["file"]] = manifest_entry(stats)
+        totals["tables"] += stats["tables"]
+        totals["xlsx"] += stats["extractor"] == "xlsx"
+        totals["ocr"] += stats["extractor"] in ("ocr", "failed")
+        if file_df is None:
             continue
+        totals["files"] += 1
+        totals["rows_read"] += file_df.shape[0]
+        yield file_df, stats
+
+def clean_reports(reports, known):
+    """Clean stage: map spreadsheet labels onto known names, in schema order."""
+    for df, stats in reports:
+        if stats["extractor"] == "xlsx":
+            df = canonical_locations(df, known)
+        yield df[COLUMNS], stats
+
+def value_bounds():
+    """Lower and upper bound of every metric column, from VALUE_RANGES."""
+    bounds = {
+        col: limits
+        for col in COLUMNS[1:-1]
+        for kind, limits in VALUE_RANGES.items() if col.endswith(kind)
+    }
+    return pd.DataFrame(bounds, index=["low", "high"])
+
+def validate_reports(reports, known, latest, totals):
+    """Validate stage: quarantine implausible rows into REJECT_CSV.
+
+    Each report is checked in one vectorised pass: the Location must be one
+    of the canonical names in ``known`` (see location_names), some metric must
+    be present and all within VALUE_RANGES, and the composite Index/Benchmark
+    must not move more than MAX_MONTHLY_CHANGE from the location's latest
+    earlier value, which advances as reports pass.
+    """
+    bounds = value_bounds()
+    for df, stats in reports:
+        # Accepted rows carry the canonical spelling ("Newmarket ", "Newmarket")
+        df = df.assign(Location=df["Location"].str.split().str.join(" "))
+        metrics = df[COLUMNS[1:-1]]
+        previous = latest.reindex(df["Location"])
+        newer = (df["Date"].to_numpy() > previous["Date"].to_numpy()) | previous["Date"].isna().to_numpy()
+        change = df[JUMP_COLUMNS].to_numpy() / previous[JUMP_COLUMNS].to_numpy() - 1
+        reason = pd.Series(np.select(
+            [
+                ~df["Location"].isin(known),
+                metrics.isna().all(axis=1),
+                (metrics.lt(bounds.loc["low"]) | metrics.gt(bounds.loc["high"])).any(axis=1),
+                newer & (np.abs(change) > MAX_MONTHLY_CHANGE).any(axis=1),
+            ],
+            ["unknown location", "no values", "value out of range", "jump from the previous month"],
+            default="",
+        ), index=df.index)
+
+        rejects = df.assign(Reason=reason)[reason != ""]
+        if not rejects.empty:
+            rejects.to_csv(REJECT_CSV, mode="a", header=not os.path.exists(REJECT_CSV), index=False)
+            totals["rejected"] += rejects.shape[0]
+            counts = ", ".join(f"{n} {r}" for r, n in rejects["Reason"].value_counts().items())
+            print(f"⚠️ Quarantined {rejects.shape[0]} rows from {stats['file']} ({counts})")
+
+        accepted = df[reason == ""]
+        latest_rows = accepted.loc[newer[reason.to_numpy() == ""], ["Location", "Date", *JUMP_COLUMNS]]
+        # Each location's row with the latest date, whole (not per-column last values)
+        latest = pd.concat([latest, latest_rows.set_index("Location")])
+        latest = latest.sort_values("Date", kind="stable", na_position="first")
+        latest = latest[~latest.index.duplicated(keep="last")]
+        yield accepted
+
+def dedupe_reports(frames, last_dates, skip_counts):
+    """Dedupe stage: keep rows newer than each location's last date.
+
+    The last dates advance with every report, so the stream never needs
+    the rows of earlier reports.
+    """
+    for df in frames:
+        new_df, skipped = select_new_rows(df, last_dates)
+        for key, count in skipped.groupby([skipped["Date"].dt.date, "Reason"]).size().items():
+            skip_counts[key] = skip_counts.get(key, 0) + count
+        if not new_df.empty:
+            latest = new_df.groupby("Location")["Date"].max()
+            last_dates = pd.concat([last_dates, latest]).groupby(level=0).max()
+        yield new_df
+
+def sort_keys(df):
+    """(Location, Date) of each row, ordered like sort_values(): missing values last."""
+    location, date = df["Location"], df["Date"]
+    return list(zip(location.isna(), location.fillna(""), date.isna(), date.fillna(pd.Timestamp(0))))
+
+def merge_sorted(chunks, new_df):
+    """Merge new rows into chunks already sorted by SORT_COLUMNS.
+
+    Each new row joins the first chunk whose last row does not sort before
+    it, so only one chunk and the new rows are in memory at a time.
+    """
+    new_df = new_df.sort_values(SORT_COLUMNS, kind="stable")
+    keys = sort_keys(new_df)
+    start = 0
+    for chunk in chunks:
+        stop = bisect.bisect_right(keys, sort_keys(chunk.tail(1))[0], lo=start) if len(chunk) else start
+        yield pd.concat([chunk, new_df.iloc[start:stop]]).sort_values(SORT_COLUMNS, kind="stable")
+        start = stop
+    yield new_df.iloc[start:]
+
+def whole_benchmarks(df):
+    """Benchmark columns holding whole dollars as Int64, so the CSV reads 824600, not 824600.0."""
+    values = df[BENCHMARK_COLUMNS]
+    whole = ((values.round() == values) | values.isna()).all()
+    return df.astype({col: "Int64" for col in whole[whole].index})
+
+def write_reports(frames, base_csv, totals):
+    """Write stage: store each report's new rows as they arrive.
+
+    Returns (final rows, first date, last date). For the CSV output each
+    report's rows are spooled to a file; at the end the base CSV, sorted by
+    SORT_COLUMNS, is copied over in chunks with the new rows merged into
+    place, next to OUTPUT_CSV, and moved into place.
+    """
+    if OUTPUT_DB:
+        # Upsert only the new rows instead of rewriting the whole history
+        import housing_db
+
+        conn = housing_db.connect(OUTPUT_DB)
+        housing_db.create_schema(conn)
+        for df in frames:
+            totals["added"] += housing_db.upsert_rows(conn, df)
+        final_rows, first_date, last_date = conn.execute(
+            "SELECT COUNT(*), MIN(Date), MAX(Date) FROM mls"
+        ).fetchone()
+        conn.close()
+        return final_rows, first_date, last_date
+
+    if OUTPUT_PARTITIONS:
+        # Write one small file per new month; earlier partitions are untouched
+        import housing_partitions
+
+        for df in frames:
+            for _, month_df in df.groupby(df["Date"].dt.to_period("M")):
+                housing_partitions.append_partition(month_df, OUTPUT_PARTITIONS)
+            totals["added"] += df.shape[0]
+        partitions = housing_partitions.read_manifest(OUTPUT_PARTITIONS)["partitions"]
+        final_rows = sum(p["rows"] for p in partitions)
+        first_date = f"{partitions[0]['year']}-{partitions[0]['month']:02d}" if partitions else None
+        last_date = f"{partitions[-1]['year']}-{partitions[-1]['month']:02d}" if partitions else None
+        return final_rows, first_date, last_date
+
+    spool_path = f"{OUTPUT_CSV}.{os.getpid()}.new.tmp"
+    tmp_path = f"{OUTPUT_CSV}.{os.getpid()}.tmp"
+    metric_dtypes = {col: "float64" for col in COLUMNS[1:-1]}
+    final_rows, dates = 0, []
+    try:
+        pd.DataFrame(columns=COLUMNS).to_csv(spool_path, index=False)
+        for df in frames:
+            df.to_csv(spool_path, mode="a", header=False, index=False)
+            totals["added"] += df.shape[0]
+        new_df = pd.read_csv(spool_path, dtype=metric_dtypes, parse_dates=["Date"])
+
+        def base_chunks():
+            for chunk in pd.read_csv(base_csv, usecols=COLUMNS, dtype=metric_dtypes, chunksize=50_000):
+                chunk["Date"] = pd.to_datetime(chunk["Date"], errors="coerce")
+                yield chunk[COLUMNS]
+
+        pd.DataFrame(columns=COLUMNS).to_csv(tmp_path, index=False)
+        for df in merge_sorted(base_chunks(), new_df):
+            whole_benchmarks(df).to_csv(tmp_path, mode="a", header=False, index=False)
+            final_rows += df.shape[0]
+            dates.extend([df["Date"].min(), df["Date"].max()])
+        os.replace(tmp_path, OUTPUT_CSV)
+    finally:
+        remove_file(spool_path)
+        remove_file(tmp_path)
+
+    if OUTPUT_SNAPSHOTS:
+        # Running dashboards pick up the new version on their next poll
+        import housing_snapshots
+
+        version = housing_snapshots.publish_snapshot(OUTPUT_CSV, OUTPUT_SNAPSHOTS)
+        print(f"Published snapshot {version}")
+    dates = pd.Series(dates).dropna()
+    return final_rows, dates.min().date(), dates.max().date()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append new monthly MLS reports (XLSX or PDF) to the master CSV.")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help=f"files to extract in parallel (this machine has {os.cpu_count()} cores)",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help=f"re-extract every file, ignoring {INGEST_MANIFEST}",
+    )
+    parser.add_argument(
+        "--only", nargs="+", metavar="PATTERN",
+        help="extract only files whose name matches, e.g. 'December_2025.*' or '*_2024.xlsx'",
+    )
+    parser.add_argument(
+        "--refresh-cache", action="store_true",
+        help=f"re-run Camelot/OCR even when {EXTRACT_CACHE} has a result",
+    )
+    args = parser.parse_args(argv)
+
+    all_files = discover_files()
+    xlsx_count = sum(f.endswith(".xlsx") for f in all_files)
+    print(f"Monthly files discovered: {len(all_files)} ({xlsx_count} XLSX, {len(all_files) - xlsx_count} PDF)")
+    if not all_files:
+        raise RuntimeError("❌ No XLSX or PDF files found — check folder paths.")
+
+    manifest = read_ingest_manifest(INGEST_MANIFEST)
+    files = select_files(all_files, manifest, args.force, args.only)
+    print(f"Files to extract:         {len(files)} ({len(all_files) - len(files)} already ingested or not selected)")
+    if not files:
+        print("Nothing new to ingest.")
+        return
+
+    # Rows from skipped files are only in earlier output, so build on that CSV
+    master_csv = MASTER_CSV
+    if len(files) < len(all_files) and not (OUTPUT_DB or OUTPUT_PARTITIONS) and os.path.exists(OUTPUT_CSV):
+        master_csv = OUTPUT_CSV
+    # With OUTPUT_DB or OUTPUT_PARTITIONS, rows are new if that output does not hold them yet
+    if OUTPUT_DB:
+        latest = load_latest_db(OUTPUT_DB)
+    elif OUTPUT_PARTITIONS:
+        latest = load_latest_partitions(OUTPUT_PARTITIONS)
+    else:
+        latest = load_latest(master_csv)
+    known = location_names()
+
+    # Each report flows through every stage before the next is extracted
+    entries, totals, skip_counts = {}, Counter(), {}
+    reports = read_reports(files, args.workers, args.refresh_cache, entries, totals)
+    reports = clean_reports(reports, known)
+    frames = validate_reports(reports, known, latest, totals)
+    frames = dedupe_reports(frames, latest["Date"], skip_counts)
+    final_rows, first_date, last_date = write_reports(frames, master_csv, totals)
+    print_skip_report(skip_counts)
+
+    # Only record the files once their rows are safely written
+    manifest["files"].update(entries)
+    write_ingest_manifest(manifest, INGEST_MANIFEST)
+
+    print("\n================ SUMMARY ================")
+    print(f"Files processed:           {totals['files']}")
+    print(f"Spreadsheets read (XLSX):  {totals['xlsx']}")
+    print(f"Tables processed (Camelot): {totals['tables']}")
+    print(f"Files read with OCR:       {totals['ocr']}")
+    print(f"Rows read from files:     {totals['rows_read']}")
+    print(f"Rows quarantined:         {totals['rejected']}")
+    print(f"New rows appended:        {totals['added']}")
+    print(f"Rows skipped:             {sum(skip_counts.values())}")
+    print(f"Final dataset rows:       {final_rows}")
+    print(f"Date range:               {first_date} → {last_date}")
+    print("========================================")
 
-    if df_list:
-        pdf_df = pd.concat(df_list, ignore_index=True)
-        rows_read += pdf_df.shape[0]
-
-        for _, row in pdf_df.iterrows():
-            location = row["Location"]
-            existing_dates = master_df.loc[master_df["Location"] == location, "Date"]
-            last_date = existing_dates.max() if not existing_dates.empty else None
-            if last_date is None or row["Date"] > last_date:
-                new_rows.append(row)
-                rows_added += 1
-
-    files_processed += 1
-
-if new_rows:
-    new_df = pd.DataFrame(new_rows)
-    final_df = pd.concat([master_df, new_df], ignore_index=True)
-else:
-    final_df = master_df.copy()
-
-final_df = final_df.sort_values(["Location", "Date"]).reset_index(drop=True)
-
-final_df.to_csv(OUTPUT_CSV, index=False)
-
-print("\n================ SUMMARY ================")
-print(f"PDF files processed:       {files_processed}")
-print(f"Tables processed (Camelot): {tables_processed}")
-print(f"Rows read from PDFs:      {rows_read}")
-print(f"New rows appended:        {rows_added}")
-print(f"Final dataset rows:       {final_df.shape[0]}")
-print(f"Date range:               {final_df['Date'].min().date()} → {final_df['Date'].max().date()}")
-print("========================================")
+if __name__ == "__main__":
+    main()
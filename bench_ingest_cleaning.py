@@ -0,0 +1,99 @@
+import argparse
+import time
+
+import pandas as pd
+
+import append_mls_data as ingest
+from append_mls_data import COLUMNS, expected_cols
+
+# Microbenchmark: the vectorised cleanup in append_mls_data.py against the
+# per-column / per-row version it replaced, on the full MLS CSV rendered the
+# way Camelot returns it ("$1,025,200", "17.83%", one string per cell).
+
+
+def legacy_fix_row(row):
+    lst = row.tolist()
+    if len(lst) > expected_cols:
+        lst = lst[:expected_cols]
+    elif len(lst) < expected_cols:
+        lst = lst + [None]*(expected_cols - len(lst))
+    return lst
+
+
+def legacy_clean_numeric(df):
+    for col in COLUMNS[1:-1]:
+        df[col] = (
+            df[col].astype(str)
+            .str.replace(r"[$,%]", "", regex=True)
+            .str.replace(",", "")
+        )
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def legacy_clean_table(rows, file_date):
+    df = pd.DataFrame(rows)
+    df = df.dropna(how='all')
+    df = df[df.iloc[:,0].notna() & df.iloc[:,0].apply(lambda x: isinstance(x, str))]
+    df_fixed = df.apply(legacy_fix_row, axis=1)
+    df = pd.DataFrame(df_fixed.tolist(), columns=COLUMNS[:-1])
+    df["Date"] = file_date
+    return legacy_clean_numeric(df)
+
+
+def camelot_rows(csv_path):
+    """The MLS history as raw Camelot-style string cells, one extra empty column."""
+    df = pd.read_csv(csv_path)[COLUMNS[:-1]]
+    cells = pd.DataFrame({"Location": df["Location"].fillna("").astype(str)})
+    for col in COLUMNS[1:-1]:
+        values = pd.to_numeric(df[col], errors="coerce")
+        if col.endswith("Benchmark"):
+            text = values.map(lambda v: f"${v:,.0f}")
+        elif col.endswith("YoYChange"):
+            text = values.map(lambda v: f"{v:.2f}%")
+        else:
+            text = values.map(lambda v: f"{v:g}")
+        cells[col] = text.where(values.notna(), "-")
+    cells["extra"] = ""
+    return cells.to_numpy().tolist()
+
+
+def best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ingest cleanup stage.")
+    parser.add_argument("--csv", default=ingest.OUTPUT_CSV)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rows = camelot_rows(args.csv)
+    file_date = pd.Timestamp("2025-12-01")
+    frame = pd.DataFrame([r[:expected_cols] for r in rows], columns=COLUMNS[:-1])
+    print(f"{len(rows)} rows × {len(COLUMNS) - 2} metric columns from {args.csv}\n")
+
+    cases = [
+        ("clean_numeric",
+         lambda: legacy_clean_numeric(frame.copy()),
+         lambda: ingest.clean_numeric(frame.copy())),
+        ("table cleanup (filter, width, numbers)",
+         lambda: legacy_clean_table(rows, file_date),
+         lambda: ingest.clean_raw({"tables": [rows], "text": None}, file_date)),
+    ]
+    for name, legacy, vectorised in cases:
+        old_time, old = best_time(legacy, args.repeat)
+        new_time, new = best_time(vectorised, args.repeat)
+        pd.testing.assert_frame_equal(old, new, check_dtype=False)
+        print(f"{name}:")
+        print(f"  legacy      {len(rows) / old_time:>12,.0f} rows/s")
+        print(f"  vectorised  {len(rows) / new_time:>12,.0f} rows/s  ({old_time / new_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,20 @@
+import calendar
 from datetime import datetime
 from pathlib import Path
 
 import faicons
 import geopandas as gpd
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import plotly.io as pio
 import shiny.experimental as x
-from ipyleaflet import DivIcon, basemaps
-from shiny import reactive, ui, App
+from ipyleaflet import DivIcon, Map, Marker, Popup, basemaps
+from ipywidgets import HTML
+from shiny import reactive, render, ui, App
 from shinywidgets import output_widget, render_widget
 
+from figure_cache import figure_cache
+from housing_data import LAYOUT, dataset_stamp, get_dataset, read_only
 from plotly_streaming import render_plotly_streaming
 
 
@@ -27,33 +30,6 @@ property_colors = {
     "Townhouse": 3,
     "Apartment": 4,
 }
-BASE_PATH = Path(__file__).resolve().parent
-
-
-def read_housing_data():
-    """Load housing CSV and preprocess dates and normalized location names."""
-
-    # Use BASE_PATH instead of redefining it
-    csv_path = BASE_PATH / "data" / "Toronto 2015-2025 - MLS_Google_MLS_FULL.csv"
-    df = pd.read_csv(csv_path)
-
-    # Ensure Date column is datetime
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-    df["Year"] = df["Date"].dt.year
-
-    # Normalize location names
-    df["Location_norm"] = (
-        df["Location"].astype(str)
-        .str.lower()
-        .str.replace(r"^(city of |town of |township of )", "", regex=True)
-        .str.strip()
-    )
-
-    # Clean column names of leading/trailing spaces
-    df.columns = df.columns.str.strip()
-
-    return df
-
 
 
 category_colors = {
@@ -130,6 +106,14 @@ def get_background_color_plotly(mode):
         return "rgb(29, 32, 33)"
 
 
+def theme_layout(mode):
+    """Layout patch that switches a chart to the light or dark theme."""
+    return dict(
+        template=get_color_template(mode),
+        paper_bgcolor=get_background_color_plotly(mode),
+    )
+
+
 def get_map_theme(mode):
     print(mode)
     if mode == "light":
@@ -165,6 +149,383 @@ def create_custom_icon(count):
     )
 
 
+def build_markers(cube, df_map):
+    """Map markers with a benchmark popup per location, for every year."""
+    markers_by_year = {}
+
+    for year in cube.years():
+        # Average benchmark per location and property type, from the cube
+        avg_dict = cube.yearly_by_type(year).fillna(0).to_dict('index')
+
+        # Create list of markers for this year
+        markers = []
+        for _, row in df_map.iterrows():
+            lat, lon, name = row["LAT"], row["LON"], row["Location"]
+
+            loc_data = avg_dict.get(name)
+            if loc_data:
+                table_html = "<table>"
+                table_html += f"<tr><th>Property Type</th><th>Avg Benchmark Price {year}</th></tr>"
+                table_html += f"<tr><td>Composite</td><td>${loc_data['Composite']:,.0f}</td></tr>"
+                table_html += f"<tr><td>Detached</td><td>${loc_data['Detached']:,.0f}</td></tr>"
+                table_html += f"<tr><td>Semi-Detached</td><td>${loc_data['Semi-Detached']:,.0f}</td></tr>"
+                table_html += f"<tr><td>Townhouse</td><td>${loc_data['Townhouse']:,.0f}</td></tr>"
+                table_html += f"<tr><td>Apartment</td><td>${loc_data['Apartment']:,.0f}</td></tr>"
+                table_html += "</table>"
+            else:
+                table_html = f"<i>No data available for {year}</i>"
+
+            marker = Marker(location=(lat, lon), draggable=False)
+            popup_content = HTML(f"<b>{name}</b><br>{table_html}")
+            popup = Popup(location=(lat, lon), child=popup_content, max_width=300)
+            marker.popup = popup
+
+            markers.append(marker)
+
+        markers_by_year[year] = markers
+
+    return markers_by_year
+
+
+## CHARTS ##
+
+def period_label(date, month):
+    # Just the year when showing the year's latest month
+    return f"{date.year}" if month is None else f"{date:%B %Y}"
+
+
+def no_data_figure(title):
+    fig = go.Figure()
+    fig.update_layout(title=title, title_x=0.5)
+    return fig
+
+
+def composition_figure(cube, year, month=None):
+    """Average benchmark share per property type in the selected month."""
+    date = cube.period_date(year, month)
+    if date is None:
+        return no_data_figure(f"No data for {year}")
+
+    # Average benchmark prices across locations
+    composition = (
+        cube.by_type(date)["mean"]
+        .rename_axis("Property Type")
+        .reset_index(name="Benchmark Value")
+    )
+
+    fig0 = px.pie(
+        composition,
+        names="Property Type",
+        values="Benchmark Value",
+        hole=0.3,
+        labels={
+            "Benchmark Value": "Benchmark Price ($)"
+        },
+        title=f"Housing Market Composition by Property Type ({period_label(date, month)})",
+        color_discrete_sequence=get_color_theme("Custom")
+    )
+
+    fig0.update_layout(
+        title_x=0.5,
+    )
+
+    fig0.update_traces(
+        textposition="outside",
+        textinfo="percent+label",
+        textfont=dict(size=15),
+    )
+
+    fig0.update_layout(showlegend=False)
+
+    return fig0
+
+
+def price_spread_figure(cube, year, month=None):
+    """Benchmark spread (max - min across locations) per property type."""
+    date = cube.period_date(year, month)
+    if date is None:
+        return no_data_figure(f"No data for {year}")
+
+    # New metric: Price Spread (Max - Min) across locations
+    spread = cube.by_type(date)
+    composition = (
+        (spread["max"] - spread["min"])
+        .rename_axis("Property Type")
+        .reset_index(name="Price Spread ($)")
+    )
+
+    fig0 = px.pie(
+        composition,
+        names="Property Type",
+        values="Price Spread ($)",
+        hole=0.3,
+        labels={"Price Spread ($)": "Price Spread ($)"},
+        title=f"Price Spread by Property Type ({period_label(date, month)})",
+        color_discrete_sequence=get_color_theme("Custom")
+    )
+
+    fig0.update_layout(
+        title_x=0.5,
+    )
+
+    fig0.update_traces(
+        textposition="outside",
+        textinfo="percent+label",
+        textfont=dict(size=15),
+    )
+
+    fig0.update_layout(showlegend=False)
+
+    return fig0
+
+
+def market_value_figure(cube, year, month=None):
+    """Summed benchmark per property type in the selected month."""
+    date = cube.period_date(year, month)
+    if date is None:
+        return no_data_figure(f"No data for {year}")
+
+    # Total market value per property type (sum of benchmarks across locations)
+    composition = (
+        cube.by_type(date)["sum"]
+        .rename_axis("Property Type")
+        .reset_index(name="Total Market Value ($)")
+    )
+
+    fig = px.pie(
+        composition,
+        names="Property Type",
+        values="Total Market Value ($)",
+        hole=0.3,
+        labels={"Total Market Value ($)": "Total Market Value ($)"},
+        title=f"Total Market Value by Property Type ({period_label(date, month)})",
+        color_discrete_sequence=get_color_theme("Custom")
+    )
+
+    fig.update_layout(
+        title_x=0.5,
+    )
+
+    fig.update_traces(
+        textposition="outside",
+        textinfo="percent+label",
+        textfont=dict(size=15),
+    )
+
+    fig.update_layout(showlegend=False)
+
+    return fig
+
+
+def location_type_figure(cube, year, month=None):
+    """Benchmark per location, stacked by property type, in the selected month."""
+    date = cube.period_date(year, month)
+    if date is None:
+        return no_data_figure(f"No data for {year}")
+
+    # Average benchmark per location & property type in the selected month
+    df_counts = cube.by_location(date).rename(columns={
+        "PropertyType": "Property Type",
+        "Benchmark": "Benchmark Value",
+    })
+    # 1️⃣ Compute total per location
+    location_totals = df_counts.groupby('Location', observed=True)['Benchmark Value'].sum()
+
+    # 2️⃣ Keep only top N locations (e.g., top 10)
+    top_locations = location_totals.sort_values(ascending=False).head(5).index
+    df_counts_filtered = df_counts[df_counts['Location'].isin(top_locations)]
+
+    # 3️⃣ Recompute total per location for text labels
+    total_location = df_counts_filtered.groupby('Location', as_index=False, observed=True)["Benchmark Value"].sum()
+
+    # Create stacked bar chart
+    fig3 = px.bar(
+        df_counts,
+        x="Location",
+        y="Benchmark Value",
+        color="Property Type",
+        text="Benchmark Value",
+        text_auto=".2s",
+        labels={
+            "Location": "Location",
+            "Benchmark Value": "Average Benchmark Price ($)",
+            "Property Type": "Property Type",
+        },
+        title=f"Average Benchmark Price by Property Type and Location ({period_label(date, month)})",
+        color_discrete_sequence=get_color_theme("Custom")
+    )
+
+    fig3.update_traces(textposition="inside")
+
+    # Add total benchmark per location on top
+    fig3.add_trace(
+        go.Scatter(
+            x=total_location["Location"],
+            y=total_location["Benchmark Value"],
+            text=total_location["Benchmark Value"].round(0),
+            mode="text",
+            textposition="top center",
+            textfont=dict(size=15),
+            showlegend=False,
+        )
+    )
+
+    fig3.update_layout(
+        title_x=0.5,
+        xaxis_tickangle=-45  # rotate labels 45° counterclockwise
+
+    )
+    fig3.update_layout(uniformtext_minsize=8, uniformtext_mode="hide")
+    fig3.update_yaxes(range=[0, max(total_location["Benchmark Value"]) * 1.1])
+
+    return fig3
+
+
+def yearly_top_figure(cube, year):
+    """Yearly composite benchmark, up to the selected year, of its top 10 locations."""
+    if year not in cube.years():
+        return no_data_figure(f"No data for {year}")
+
+    # Use a benchmark metric (Composite is safest)
+    df_yearly = cube.yearly_values("Composite").rename(
+        columns={"Benchmark_mean": "CompBenchmark"}
+    )
+
+    # Pick top 10 locations in the selected year
+    top_locations = cube.top_locations(year, 10)
+
+    df_top = df_yearly[df_yearly["Location"].isin(top_locations) & (df_yearly["Year"] <= year)]
+
+    fig = px.bar(
+        df_top,
+        x="Location",
+        y="CompBenchmark",
+        color="Year",
+        barmode="group",  # <-- important for year comparison
+        text_auto=".2s",
+        labels={
+            "Location": "Toronto Region",
+            "CompBenchmark": "Average Benchmark Price ($)",
+            "Year": "Year",
+        },
+        title=f"Top 10 Toronto Regions by Composite Benchmark Price in {year} (Yearly Comparison)",
+        color_discrete_sequence=get_color_theme("Custom")
+    )
+
+    fig.update_layout(
+        title_x=0.5,
+    )
+
+    fig.update_layout(uniformtext_minsize=8, uniformtext_mode="hide")
+
+    return fig
+
+
+def inflation_trend_figure(cube, year, month=None):
+    """Year-over-year HPI change per property type, up to the selected month."""
+    date = cube.period_date(year, month)
+    if date is None:
+        return no_data_figure(f"No data for {year}")
+
+    # YoY change of the HPI Index, averaged across locations
+    trend = (
+        cube.analytics.type_trend("YoY", end=date)
+        .rename_axis(columns="Property Type")
+        .stack()
+        .dropna()
+        .reset_index(name="YoY Change (%)")
+    )
+
+    fig = px.line(
+        trend,
+        x="Date",
+        y="YoY Change (%)",
+        color="Property Type",
+        labels={"YoY Change (%)": "Year-over-Year Change (%)"},
+        title=f"Year-over-Year HPI Change by Property Type (to {period_label(date, month)})",
+        color_discrete_sequence=get_color_theme("Custom")
+    )
+
+    fig.add_hline(y=0, line_dash="dot", line_color="gray")
+    fig.update_layout(title_x=0.5, hovermode="x unified")
+
+    return fig
+
+
+def inflation_heatmap_figure(cube, year):
+    """Monthly composite YoY HPI change of the selected year's top 15 locations."""
+    dates = [date for date in cube.dates if date.year == year]
+    ranked = list(cube.top_locations(year, None)) if dates else []
+
+    # The 15 highest-priced locations that have a YoY change that year
+    table = (
+        cube.analytics.location_table("YoY", ranked, dates[0], dates[-1])
+        .reindex(columns=dates)
+        .head(15)
+        if ranked else None
+    )
+    if table is None or table.empty:
+        return no_data_figure(f"No year-over-year data for {year}")
+
+    # Months a location has no value for are gaps; NaN is not valid JSON
+    fig = go.Figure(
+        go.Heatmap(
+            z=table.astype(object).where(table.notna(), None).to_numpy().tolist(),
+            x=[f"{date:%b}" for date in dates],
+            y=[str(name) for name in table.index],
+            colorscale="RdBu_r",
+            zmid=0,
+            texttemplate="%{z:.1f}",
+            colorbar=dict(title="YoY Change (%)"),
+            hovertemplate="Month=%{x}<br>Location=%{y}<br>YoY Change (%)=%{z:.1f}<extra></extra>",
+        )
+    )
+
+    fig.update_layout(
+        title=(
+            f"Composite HPI Year-over-Year Change (%) — Top {len(table)} Regions in {year}"
+        ),
+        title_x=0.5,
+        xaxis_title="Month",
+        yaxis=dict(title="Location", autorange="reversed"),
+    )
+
+    return fig
+
+
+def growth_figure(cube, year):
+    """Compound annual growth of the composite HPI of the selected year's top 15 locations."""
+    top_locations = list(cube.top_locations(year, 15)) if year in cube.years() else []
+    if not top_locations:
+        return no_data_figure(f"No data for {year}")
+
+    # Growth over each location's whole reported history
+    cagr = cube.analytics.cagr
+    rows = cagr[
+        (cagr["PropertyType"] == "Composite")
+        & cagr["Location"].isin(top_locations)
+        & cagr["CAGR"].notna()
+    ]
+    if rows.empty:
+        return no_data_figure(f"No growth data for {year}")
+    rows = rows.assign(Location=rows["Location"].astype(str)).sort_values("CAGR", ascending=False)
+
+    fig = px.bar(
+        rows,
+        x="Location",
+        y="CAGR",
+        text_auto=".1f",
+        hover_data={"Start": "|%b %Y", "End": "|%b %Y"},
+        labels={"Location": "Toronto Region", "CAGR": "Compound Annual Growth (%)"},
+        title=f"Composite HPI Compound Annual Growth (%) — Top 15 Regions in {year}",
+        color_discrete_sequence=get_color_theme("Custom")
+    )
+
+    fig.update_layout(title_x=0.5, xaxis_tickangle=-45)
+
+    return fig
+
+
 app_ui = ui.page_fillable(
     ui.page_navbar(
         ui.nav_panel(
@@ -176,14 +537,14 @@ app_ui = ui.page_fillable(
                         showcase=faicons.icon_svg(
                             "people-group", width="50px", fill="#FD9902 !important"
                         ),
-                        value=len(read_housing_data()),
+                        value=ui.output_text("total_listings"),
                     ),
                     ui.value_box(
                         title="Locations",
                         showcase=faicons.icon_svg(
                             "globe", width="50px", fill="#FD9902 !important"
                         ),
-                        value=read_housing_data()["Location"].nunique(),
+                        value=ui.output_text("n_locations"),
                     ),
                     ui.value_box(
                         title="Housing Types",
@@ -197,7 +558,7 @@ app_ui = ui.page_fillable(
                         showcase=faicons.icon_svg(
                             "calendar", width="50px", fill="#FD9902 !important"
                         ),
-                        value=read_housing_data()["Date"].nunique(),
+                        value=ui.output_text("n_periods"),
 
                     ),
                     col_widths=(3, 3, 3, 3),
@@ -218,6 +579,19 @@ app_ui = ui.page_fillable(
                     col_widths=(6, 6),
                 ),
             ),
+            ui.row(
+                ui.layout_columns(
+                    x.ui.card(output_widget("plot_5")),
+                    x.ui.card(output_widget("plot_6")),
+                    col_widths=(6, 6),
+                ),
+            ),
+            ui.row(
+                ui.layout_columns(
+                    x.ui.card(output_widget("plot_7")),
+                    col_widths=(12,),
+                ),
+            ),
         ),
         ui.nav_panel(
             "Map",
@@ -237,6 +611,15 @@ app_ui = ui.page_fillable(
                 choices=[str(y) for y in range(2015, 2026)],  # 2015-2025
                 selected="2025",
         ),
+            ui.input_select(
+                id="selected_month",
+                label="Select Month",
+                choices={
+                    "latest": "Latest available",
+                    **{str(m): calendar.month_name[m] for m in range(1, 13)},
+                },
+                selected="latest",
+            ),
 
             ui.input_dark_mode(id="dark_mode", mode="light"),
             open="open",
@@ -277,75 +660,55 @@ app_ui = ui.page_fillable(
 def server(input, output, session):
 
     # --- Step 2: Load housing data ---
-    housing_df = read_housing_data()
-
-    df_map = pd.read_csv(
-        Path(__file__).parent / "data" / "location_coords.csv"
-    )
-
-    housing_df["Date"] = pd.to_datetime(housing_df["Date"])
-    housing_df["Year"] = housing_df["Date"].dt.year
-
-    # --- Step 3: Merge housing counts with shapefile coordinates ---
-    housing_by_region = (
-        housing_df.groupby("Location")  # use the correct column
-        .size()
-        .reset_index(name="count")
-        .rename(columns={"Location": "NAME"})  # match the shapefile NAME column
-    )
-
+    # Shared dataset, re-checked every few seconds; a newly published version
+    # is swapped in for this session without a restart. Charts only read its
+    # aggregate cube (pandas or SQLite)
+    @reactive.poll(dataset_stamp, 5)
+    def dataset():
+        return get_dataset()
+
+    if LAYOUT == "snapshots":
+        from housing_snapshots import release, retain
+
+        # Hold the snapshot this session shows so it is not collected under it
+        held = {"version": None}
+
+        @reactive.Effect
+        def _hold_snapshot():
+            version = dataset().stamp
+            if version != held["version"]:
+                retain(version)
+                if held["version"] is not None:
+                    release(held["version"])
+                held["version"] = version
+
+        def _release_snapshot():
+            if held["version"] is not None:
+                release(held["version"])
+
+        session.on_ended(_release_snapshot)
 
-    base_path = Path(__file__).parent
-
-    df_map = pd.read_csv(base_path / "data" / "location_coords.csv")
-    housing_df = pd.read_csv(base_path / "data" / "Toronto 2015-2025 - MLS_Google_MLS_FULL.csv")
-    housing_df["Date"] = pd.to_datetime(housing_df["Date"])
-    housing_df["Year"] = housing_df["Date"].dt.year
-
-    from ipyleaflet import Map, Marker, Popup
-    from ipywidgets import HTML
-
-    # Precompute markers for all years
-    all_years = housing_df["Year"].unique()
-    markers_by_year = {}
-
-    for year in all_years:
-        housing_year = housing_df[housing_df["Year"] == year]
-
-        # Compute averages
-        avg_year = housing_year.groupby("Location", as_index=False)[[
-            "CompBenchmark", "SFDetachBenchmark", "SFAttachBenchmark",
-            "THouseBenchmark", "ApartBenchmark"
-        ]].mean().fillna(0)
-
-        avg_dict = avg_year.set_index("Location").to_dict('index')
-
-        # Create list of markers for this year
-        markers = []
-        for _, row in df_map.iterrows():
-            lat, lon, name = row["LAT"], row["LON"], row["Location"]
-
-            loc_data = avg_dict.get(name)
-            if loc_data:
-                table_html = "<table>"
-                table_html += f"<tr><th>Property Type</th><th>Avg Benchmark Price {year}</th></tr>"
-                table_html += f"<tr><td>Composite</td><td>${loc_data['CompBenchmark']:,.0f}</td></tr>"
-                table_html += f"<tr><td>Detached</td><td>${loc_data['SFDetachBenchmark']:,.0f}</td></tr>"
-                table_html += f"<tr><td>Semi-Detached</td><td>${loc_data['SFAttachBenchmark']:,.0f}</td></tr>"
-                table_html += f"<tr><td>Townhouse</td><td>${loc_data['THouseBenchmark']:,.0f}</td></tr>"
-                table_html += f"<tr><td>Apartment</td><td>${loc_data['ApartBenchmark']:,.0f}</td></tr>"
-                table_html += "</table>"
-            else:
-                table_html = f"<i>No data available for {year}</i>"
+    @output
+    @render.text
+    def total_listings():
+        return dataset().total_listings
 
-            marker = Marker(location=(lat, lon), draggable=False)
-            popup_content = HTML(f"<b>{name}</b><br>{table_html}")
-            popup = Popup(location=(lat, lon), child=popup_content, max_width=300)
-            marker.popup = popup
+    @output
+    @render.text
+    def n_locations():
+        return dataset().n_locations
 
-            markers.append(marker)
+    @output
+    @render.text
+    def n_periods():
+        return dataset().n_periods
 
-        markers_by_year[year] = markers
+    # Precompute markers for all years of the current dataset version
+    @reactive.Calc
+    def markers_by_year():
+        data = dataset()
+        with read_only(data, "markers_by_year"):
+            return build_markers(data.cube, data.coords)
 
     @reactive.Calc
     @output
@@ -355,323 +718,97 @@ def server(input, output, session):
         selected_year = int(input.selected_year())
 
         # Add all markers for the selected year
-        for marker in markers_by_year.get(selected_year, []):
+        for marker in markers_by_year().get(selected_year, []):
             map_widget.add_layer(marker)
 
         return map_widget
 
     ## MAP ##
 
-    @reactive.Calc
-    @output
-    @render_plotly_streaming()
-    def plot_0():
-        # Ensure Date is datetime
-        housing_df["Date"] = pd.to_datetime(housing_df["Date"])
-
-        # Use most recent date in dataset
-        latest_date = housing_df["Date"].max()
-
-        latest = housing_df[housing_df["Date"] == latest_date]
-
-        # Average benchmark prices across locations
-        composition = pd.DataFrame({
-            "Property Type": [
-                "Composite",
-                "Detached",
-                "Semi-Detached",
-                "Townhouse",
-                "Apartment"
-            ],
-            "Benchmark Value": [
-                latest["CompBenchmark"].mean(),
-                latest["SFDetachBenchmark"].mean(),
-                latest["SFAttachBenchmark"].mean(),
-                latest["THouseBenchmark"].mean(),
-                latest["ApartBenchmark"].mean(),
-            ]
-        })
-
-        fig0 = px.pie(
-            composition,
-            names="Property Type",
-            values="Benchmark Value",
-            hole=0.3,
-            labels={
-                "Benchmark Value": "Benchmark Price ($)"
-            },
-            title=f"Housing Market Composition by Property Type ({latest_date.year})",
-            template=get_color_template(input.dark_mode()),
-            color_discrete_sequence=get_color_theme("Custom")
-        )
-
-        fig0.update_layout(
-            paper_bgcolor=get_background_color_plotly(input.dark_mode()),
-            title_x=0.5,
-        )
-
-        fig0.update_traces(
-            textposition="outside",
-            textinfo="percent+label",
-            textfont=dict(size=15),
+    # Offer the years the current dataset version actually covers
+    @reactive.Effect
+    def _sync_years():
+        years = [str(year) for year in dataset().cube.years()]
+        if not years:
+            # An empty dataset: keep the default choices, the charts say "No data"
+            return
+        with reactive.isolate():
+            selected = input.selected_year()
+        ui.update_select(
+            "selected_year",
+            choices=years,
+            selected=selected if selected in years else years[-1],
         )
 
-        fig0.update_layout(showlegend=False)
-
-        return fig0
-
     @reactive.Calc
-    @output
-    @render_plotly_streaming()
-    def plot_2():
-        # Ensure Date is datetime
-        housing_df["Date"] = pd.to_datetime(housing_df["Date"])
-
-        # Most recent date
-        latest_date = housing_df["Date"].max()
-        latest = housing_df[housing_df["Date"] == latest_date]
-
-        # New metric: Price Spread (Max - Min) across locations
-        composition = pd.DataFrame({
-            "Property Type": [
-                "Composite",
-                "Detached",
-                "Semi-Detached",
-                "Townhouse",
-                "Apartment"
-            ],
-            "Price Spread ($)": [
-                latest["CompBenchmark"].max() - latest["CompBenchmark"].min(),
-                latest["SFDetachBenchmark"].max() - latest["SFDetachBenchmark"].min(),
-                latest["SFAttachBenchmark"].max() - latest["SFAttachBenchmark"].min(),
-                latest["THouseBenchmark"].max() - latest["THouseBenchmark"].min(),
-                latest["ApartBenchmark"].max() - latest["ApartBenchmark"].min()
-            ]
-        })
-
-        fig0 = px.pie(
-            composition,
-            names="Property Type",
-            values="Price Spread ($)",
-            hole=0.3,
-            labels={"Price Spread ($)": "Price Spread ($)"},
-            title=f"Price Spread by Property Type ({latest_date.year})",
-            template=get_color_template(input.dark_mode()),
-            color_discrete_sequence=get_color_theme("Custom")
-        )
+    def selected_period():
+        # The year's latest month unless a month is picked
+        month = input.selected_month()
+        return int(input.selected_year()), None if month == "latest" else int(month)
 
-        fig0.update_layout(
-            paper_bgcolor=get_background_color_plotly(input.dark_mode()),
-            title_x=0.5,
-        )
+    def cached_figure(build, *args):
+        # Each figure is built once per worker for a dataset version and
+        # period; switching period is a cache lookup plus an in-place update
+        data = dataset()
 
-        fig0.update_traces(
-            textposition="outside",
-            textinfo="percent+label",
-            textfont=dict(size=15),
-        )
+        def build_figure():
+            with read_only(data, build.__name__):
+                return build(data.cube, *args)
 
-        fig0.update_layout(showlegend=False)
+        return figure_cache.get((build.__name__, data.stamp, *args), build_figure)
 
-        return fig0
+    # The theme is patched onto the existing widgets, so toggling dark mode
+    # neither rebuilds nor re-aggregates any chart
+    def chart_theme():
+        return theme_layout(input.dark_mode())
 
+    @reactive.Calc
+    @output
+    @render_plotly_streaming(theme=chart_theme)
+    def plot_0():
+        return cached_figure(composition_figure, *selected_period())
 
+    @reactive.Calc
+    @output
+    @render_plotly_streaming(theme=chart_theme)
+    def plot_2():
+        return cached_figure(price_spread_figure, *selected_period())
 
     @reactive.Calc
     @output
-    @render_plotly_streaming()
+    @render_plotly_streaming(theme=chart_theme)
     def plot_1():
-        # Ensure Date is datetime
-        housing_df["Date"] = pd.to_datetime(housing_df["Date"])
-
-        # Use most recent date in dataset
-        latest_date = housing_df["Date"].max()
-        latest = housing_df[housing_df["Date"] == latest_date]
-
-        # Total market value per property type (sum of benchmarks across locations)
-        composition = pd.DataFrame({
-            "Property Type": [
-                "Composite",
-                "Detached",
-                "Semi-Detached",
-                "Townhouse",
-                "Apartment"
-            ],
-            "Total Market Value ($)": [
-                latest["CompBenchmark"].sum(),
-                latest["SFDetachBenchmark"].sum(),
-                latest["SFAttachBenchmark"].sum(),
-                latest["THouseBenchmark"].sum(),
-                latest["ApartBenchmark"].sum(),
-            ]
-        })
-
-        fig = px.pie(
-            composition,
-            names="Property Type",
-            values="Total Market Value ($)",
-            hole=0.3,
-            labels={"Total Market Value ($)": "Total Market Value ($)"},
-            title=f"Total Market Value by Property Type ({latest_date.year})",
-            template=get_color_template(input.dark_mode()),
-            color_discrete_sequence=get_color_theme("Custom")
-        )
-
-        fig.update_layout(
-            paper_bgcolor=get_background_color_plotly(input.dark_mode()),
-            title_x=0.5,
-        )
-
-        fig.update_traces(
-            textposition="outside",
-            textinfo="percent+label",
-            textfont=dict(size=15),
-        )
-
-        fig.update_layout(showlegend=False)
-
-        return fig
+        return cached_figure(market_value_figure, *selected_period())
 
     @reactive.Calc
     @output
-    @render_plotly_streaming()
+    @render_plotly_streaming(theme=chart_theme)
     def plot_4():
-        # Ensure Date is datetime
-        housing_df["Date"] = pd.to_datetime(housing_df["Date"])
-
-        # Most recent date
-        latest_date = housing_df["Date"].max()
-        latest = housing_df[housing_df["Date"] == latest_date]
-
-        # Melt the dataframe to long format: Location x Property Type x Benchmark
-        df_long = latest.melt(
-            id_vars=["Location"],
-            value_vars=[
-                "CompBenchmark",
-                "SFDetachBenchmark",
-                "SFAttachBenchmark",
-                "THouseBenchmark",
-                "ApartBenchmark"
-            ],
-            var_name="Property Type",
-            value_name="Benchmark Value"
-        )
-
-        # Clean Property Type names
-        df_long["Property Type"] = df_long["Property Type"].replace({
-            "CompBenchmark": "Composite",
-            "SFDetachBenchmark": "Detached",
-            "SFAttachBenchmark": "Semi-Detached",
-            "THouseBenchmark": "Townhouse",
-            "ApartBenchmark": "Apartment"
-        })
-
-        # Aggregate: average benchmark per location & property type
-        df_counts = df_long.groupby(["Location", "Property Type"], as_index=False)["Benchmark Value"].mean()
-        # 1️⃣ Compute total per location
-        location_totals = df_counts.groupby('Location')['Benchmark Value'].sum()
-
-        # 2️⃣ Keep only top N locations (e.g., top 10)
-        top_locations = location_totals.sort_values(ascending=False).head(5).index
-        df_counts_filtered = df_counts[df_counts['Location'].isin(top_locations)]
-
-        # 3️⃣ Recompute total per location for text labels
-        total_location = df_counts_filtered.groupby('Location', as_index=False)["Benchmark Value"].sum()
-
-        # Create stacked bar chart
-        fig3 = px.bar(
-            df_counts,
-            x="Location",
-            y="Benchmark Value",
-            color="Property Type",
-            text="Benchmark Value",
-            text_auto=".2s",
-            labels={
-                "Location": "Location",
-                "Benchmark Value": "Average Benchmark Price ($)",
-                "Property Type": "Property Type",
-            },
-            title="Average Benchmark Price by Property Type and Location (2025)",
-            template=get_color_template(input.dark_mode()),
-            color_discrete_sequence=get_color_theme("Custom")
-        )
-
-        fig3.update_traces(textposition="inside")
-
-        # Add total benchmark per location on top
-        fig3.add_trace(
-            go.Scatter(
-                x=total_location["Location"],
-                y=total_location["Benchmark Value"],
-                text=total_location["Benchmark Value"].round(0),
-                mode="text",
-                textposition="top center",
-                textfont=dict(size=15),
-                showlegend=False,
-            )
-        )
-
-        fig3.update_layout(
-            paper_bgcolor=get_background_color_plotly(input.dark_mode()),
-            title_x=0.5,
-            xaxis_tickangle=-45  # rotate labels 45° counterclockwise
-
-        )
-        fig3.update_layout(uniformtext_minsize=8, uniformtext_mode="hide")
-        fig3.update_yaxes(range=[0, max(total_location["Benchmark Value"]) * 1.1])
-
-        return fig3
+        return cached_figure(location_type_figure, *selected_period())
 
     @reactive.Calc
     @output
-    @render_plotly_streaming()
+    @render_plotly_streaming(theme=chart_theme)
     def plot_3():
-        # Ensure datetime
-        housing_df["Date"] = pd.to_datetime(housing_df["Date"])
-        housing_df["Year"] = housing_df["Date"].dt.year
-
-        # Use a benchmark metric (Composite is safest)
-        df_yearly = (
-            housing_df
-            .groupby(["Location", "Year"], as_index=False)["CompBenchmark"]
-            .mean()
-        )
-
-        # Pick top 10 locations by latest year
-        latest_year = df_yearly["Year"].max()
-        top_locations = (
-            df_yearly[df_yearly["Year"] == latest_year]
-            .sort_values("CompBenchmark", ascending=False)
-            .head(10)["Location"]
-        )
+        return cached_figure(yearly_top_figure, selected_period()[0])
 
-        df_top = df_yearly[df_yearly["Location"].isin(top_locations)]
-
-        fig = px.bar(
-            df_top,
-            x="Location",
-            y="CompBenchmark",
-            color="Year",
-            barmode="group",  # <-- important for year comparison
-            text_auto=".2s",
-            labels={
-                "Location": "Toronto Region",
-                "CompBenchmark": "Average Benchmark Price ($)",
-                "Year": "Year",
-            },
-            title="Top 10 Toronto Regions by Composite Benchmark Price (Yearly Comparison)",
-            template=get_color_template(input.dark_mode()),
-            color_discrete_sequence=get_color_theme("Custom")
-        )
-
-        fig.update_layout(
-            paper_bgcolor=get_background_color_plotly(input.dark_mode()),
-            title_x=0.5,
-        )
+    @reactive.Calc
+    @output
+    @render_plotly_streaming(theme=chart_theme)
+    def plot_5():
+        return cached_figure(inflation_trend_figure, *selected_period())
 
-        fig.update_layout(uniformtext_minsize=8, uniformtext_mode="hide")
+    @reactive.Calc
+    @output
+    @render_plotly_streaming(theme=chart_theme)
+    def plot_6():
+        return cached_figure(inflation_heatmap_figure, selected_period()[0])
 
-        return fig
+    @reactive.Calc
+    @output
+    @render_plotly_streaming(theme=chart_theme)
+    def plot_7():
+        return cached_figure(growth_figure, selected_period()[0])
 
 
 static_dir = Path(__file__).parent / "static"
@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Finished chart figures shared by every session of this worker. Set
+# HOUSING_FIGURE_CACHE_SIZE=0 to build every figure per session. The default
+# holds every chart for every year and month of a dataset version (5 charts
+# x 11 years x 13 month choices, plus 3 charts per year) at a few tens of KB
+# per figure
+FIGURE_CACHE_SIZE = int(os.environ.get("HOUSING_FIGURE_CACHE_SIZE", "1024"))
+FIGURE_CACHE_TTL = float(os.environ.get("HOUSING_FIGURE_CACHE_TTL", "3600"))
+
+
+class FigureCache:
+    """Process-wide LRU of built figures, bounded in size and age.
+
+    Keys name the chart, the dataset version and every input the chart
+    reads, so a new dataset version or theme simply misses. Figures are
+    shared between sessions and must not be modified after they are cached.
+    """
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE, ttl=FIGURE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """Return the figure cached under ``key``, calling ``build()`` on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Build outside the lock so a slow chart does not hold up cache hits
+        figure = build()
+        with self._lock:
+            self._entries[key] = (now, figure)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return figure
+
+    def stats(self):
+        """Hit and miss counters and the number of cached figures."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+figure_cache = FigureCache()
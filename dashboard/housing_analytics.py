@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+# Rolling windows, in months, for the moving averages and volatility
+ROLLING_WINDOWS = [3, 6, 12]
+
+
+class HousingAnalytics:
+    """Trend and inflation metrics of the HPI Index per Location × PropertyType.
+
+    ``series`` has one row per Location, PropertyType and month with an
+    Index: MoM and YoY (% change of the Index from 1 and 12 months earlier),
+    ReportedYoY (the report's own YoY column), AvgN (rolling N-month mean of
+    the Index) and VolN (rolling N-month standard deviation of MoM).
+    ``type_means`` averages those columns across locations per Date ×
+    PropertyType, and ``cagr`` is each series' compound annual growth over
+    its whole history.
+    """
+
+    def __init__(self, series, type_means, cagr):
+        self.series = series
+        self.type_means = type_means
+        self.cagr = cagr
+
+    def type_trend(self, column, end=None):
+        """Date × PropertyType table of a column's mean across locations, up to ``end``."""
+        table = self.type_means[column].unstack("PropertyType")
+        return table if end is None else table.loc[:end]
+
+    def location_table(self, column, locations, start, end, property_type="Composite"):
+        """Location × Date table of one property type's ``column`` between two dates."""
+        rows = self.series[
+            (self.series["PropertyType"] == property_type)
+            & self.series["Location"].isin(locations)
+            & self.series["Date"].between(start, end)
+        ]
+        table = rows.pivot_table(index="Location", columns="Date", values=column, observed=True)
+        return table.reindex([name for name in locations if name in table.index])
+
+
+def _compound_growth(index, dates):
+    """CAGR (%) from each column's first to its last Index value."""
+    values = index.to_numpy()
+    valid = ~np.isnan(values)
+    has_data = valid.any(axis=0)
+    first = valid.argmax(axis=0)
+    last = len(values) - 1 - valid[::-1].argmax(axis=0)
+    columns = np.arange(values.shape[1])
+    years = (last - first) / 12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (values[last, columns] / values[first, columns]) ** (1 / years) - 1
+    growth = np.where(years > 0, growth * 100, np.nan)
+
+    return pd.DataFrame({
+        "Location": index.columns.get_level_values("Location"),
+        "PropertyType": index.columns.get_level_values("PropertyType"),
+        "Start": dates[first],
+        "End": dates[last],
+        "CAGR": growth,
+    })[has_data].reset_index(drop=True)
+
+
+def _categorical(values, like):
+    # Keep the long table's categories (and so the property type order)
+    dtype = like.dtype if isinstance(like.dtype, pd.CategoricalDtype) else None
+    return pd.Categorical(values, dtype=dtype)
+
+
+def as_float64(values):
+    """Upcast a column to float64, recovering the decimals of compact float32 values.
+
+    float32 values go through their shortest decimal form, so a compact 312.3
+    comes back as 312.3 rather than 312.29998779296875 and every mean and
+    return matches the default profile exactly.
+    """
+    if values.dtype == "float32":
+        return pd.Series(values.to_numpy().astype(str).astype("float64"), index=values.index)
+    return values.astype("float64")
+
+
+def build_analytics(long):
+    """Compute every trend metric in one vectorised pass over the long table.
+
+    The Index is pivoted into a Date × (Location, PropertyType) matrix on a
+    complete monthly calendar, so lags and rolling windows count calendar
+    months even where a report is missing, and each metric is a single
+    column-wise operation on that matrix.
+    """
+    dated = long[long["Date"].notna() & long["Location"].notna()]
+    if dated.empty:
+        empty = pd.DataFrame(columns=["Location", "PropertyType", "Date"])
+        cagr = pd.DataFrame(columns=["Location", "PropertyType", "Start", "End", "CAGR"])
+        return HousingAnalytics(empty, empty, cagr)
+
+    # Duplicate rows for a location and month are averaged
+    grouped = (
+        dated.assign(Index=as_float64(dated["Index"]), YoY=as_float64(dated["YoY"]))
+        .groupby(["Date", "Location", "PropertyType"], observed=True)[["Index", "YoY"]]
+        .mean()
+    )
+    dates = pd.date_range(grouped.index.levels[0].min(), grouped.index.levels[0].max(), freq="MS")
+    wide = grouped.unstack(["Location", "PropertyType"]).reindex(dates)
+    # A zero Index marks a property type the report had no data for
+    index = wide["Index"].where(wide["Index"] > 0)
+
+    mom = index.pct_change(fill_method=None) * 100
+    metrics = {
+        "Index": index,
+        "MoM": mom,
+        "YoY": index.pct_change(12, fill_method=None) * 100,
+        "ReportedYoY": wide["YoY"],
+    }
+    for window in ROLLING_WINDOWS:
+        metrics[f"Avg{window}"] = index.rolling(window, min_periods=window).mean()
+        metrics[f"Vol{window}"] = mom.rolling(window, min_periods=window).std()
+
+    # Back to one row per Location × PropertyType × month
+    n_dates, n_series = index.shape
+    locations = _categorical(index.columns.get_level_values("Location"), dated["Location"])
+    property_types = _categorical(
+        index.columns.get_level_values("PropertyType"), dated["PropertyType"]
+    )
+    series = pd.DataFrame({
+        "Location": pd.Categorical.from_codes(
+            np.tile(locations.codes, n_dates), dtype=locations.dtype
+        ),
+        "PropertyType": pd.Categorical.from_codes(
+            np.tile(property_types.codes, n_dates), dtype=property_types.dtype
+        ),
+        "Date": np.repeat(dates.to_numpy(), n_series),
+        **{name: table.to_numpy().ravel() for name, table in metrics.items()},
+    })
+    series = series[series["Index"].notna()].reset_index(drop=True)
+
+    type_means = series.groupby(["Date", "PropertyType"], observed=True)[list(metrics)].mean()
+    return HousingAnalytics(series, type_means, _compound_growth(index, dates))
@@ -0,0 +1,186 @@
+import pandas as pd
+
+from housing_analytics import as_float64, build_analytics
+
+CUBE_METRICS = ["Benchmark", "Index"]
+CUBE_STATS = ["mean", "min", "max", "sum"]
+# Columns the yearly and monthly aggregates read
+FINGERPRINT_COLUMNS = ["Location", "Date", "PropertyType", *CUBE_METRICS]
+
+
+def _canonical_dtypes(long):
+    # Aggregate in float64 (and int32 years, as Date.dt.year returns)
+    # whatever dtype profile the long table uses; undated rows have no year
+    long = long[long["Date"].notna()]
+    return long.assign(
+        Year=long["Year"].astype("int32"),
+        **{m: as_float64(long[m]) for m in [*CUBE_METRICS, "YoY"]},
+    )
+
+
+def _year_fingerprint(long):
+    """Row count and a hash of every aggregated column per year, to spot changed years.
+
+    Row hashes are summed (wrapping in uint64), so the fingerprint does not
+    depend on row order but changes with any value, label or type edit.
+    """
+    hashes = pd.util.hash_pandas_object(long[FINGERPRINT_COLUMNS], index=False)
+    fingerprint = hashes.groupby(long["Year"]).agg(["size", "sum"])
+    fingerprint.columns = ["rows", "hash"]
+    return fingerprint
+
+
+def _aggregate_months(long):
+    """Per-month snapshot tables, keyed by Date.
+
+    Each entry holds the Benchmark stats per property type across locations
+    and the mean Benchmark per location × property type for that month.
+    """
+    by_type = long.groupby(["Date", "PropertyType"], observed=True)["Benchmark"].agg(CUBE_STATS)
+    by_location = (
+        long.groupby(["Date", "Location", "PropertyType"], observed=True)["Benchmark"]
+        .mean()
+        .reset_index()
+    )
+    location_rows = by_location.groupby("Date").indices
+    return {
+        date: (
+            table.droplevel("Date"),
+            by_location.iloc[location_rows[date]].drop(columns="Date").reset_index(drop=True),
+        )
+        for date, table in by_type.groupby(level="Date")
+    }
+
+
+def period_date(dates, year, month=None):
+    """The month to show for a year (and optional month) selection.
+
+    That month if it has data, else the latest earlier month of the year,
+    else the year's first month; with no month, the year's latest month.
+    None when the year has no data. ``dates`` must be sorted.
+    """
+    in_year = [date for date in dates if date.year == year]
+    if not in_year:
+        return None
+    if month is None:
+        return in_year[-1]
+    earlier = [date for date in in_year if date.month <= month]
+    return earlier[-1] if earlier else in_year[0]
+
+
+def _aggregate_years(long):
+    yearly = (
+        long.groupby(["Location", "Year", "PropertyType"], observed=True)[CUBE_METRICS]
+        .agg(CUBE_STATS)
+    )
+    yearly.columns = [f"{metric}_{stat}" for metric, stat in yearly.columns]
+    return yearly
+
+
+class HousingCube:
+    """Aggregates every chart reads instead of the raw rows.
+
+    ``yearly`` holds mean/min/max/sum of Benchmark and Index per
+    Location × Year × PropertyType. ``months`` maps every Date to its
+    snapshot: the per-property-type stats across locations and the
+    per-location means, so picking a month is a dictionary lookup. Tables
+    are shared by every session and handed out as copy-on-write views.
+    ``analytics`` holds the trend metrics (see housing_analytics).
+    """
+
+    def __init__(self, yearly, fingerprint, months, analytics):
+        self.yearly = yearly
+        self.fingerprint = fingerprint
+        self.months = months
+        self.analytics = analytics
+        self.dates = sorted(months)
+        self.latest_date = self.dates[-1] if self.dates else None
+
+    @property
+    def latest_by_type(self):
+        return self.by_type(self.latest_date)
+
+    @property
+    def latest_by_location(self):
+        return self.by_location(self.latest_date)
+
+    def years(self):
+        return self.yearly.index.get_level_values("Year").unique().tolist()
+
+    def period_date(self, year, month=None):
+        """Date of the month shown for a year/month selection (see period_date)."""
+        return period_date(self.dates, year, month)
+
+    def by_type(self, date):
+        """Benchmark mean/min/max/sum per property type across locations in one month."""
+        return self.months[date][0].copy(deep=False)
+
+    def by_location(self, date):
+        """Mean Benchmark per Location × PropertyType in one month."""
+        return self.months[date][1].copy(deep=False)
+
+    def yearly_values(self, property_type, column="Benchmark_mean"):
+        """One row per Location × Year for a single property type."""
+        values = self.yearly.xs(property_type, level="PropertyType")[column]
+        return values.reset_index()
+
+    def yearly_by_type(self, year, column="Benchmark_mean"):
+        """Location × PropertyType table for one year (empty if the year is missing)."""
+        if year not in self.yearly.index.get_level_values("Year"):
+            return pd.DataFrame()
+        return self.yearly.xs(year, level="Year")[column].unstack("PropertyType")
+
+    def top_locations(self, year, n, property_type="Composite", column="Benchmark_mean"):
+        """The n locations with the highest ``column`` value in ``year``, all when n is None."""
+        values = self.yearly_values(property_type, column)
+        ranked = values[values["Year"] == year].sort_values(column, ascending=False)
+        return ranked["Location"] if n is None else ranked.head(n)["Location"]
+
+
+def build_cube(long, previous=None, index=None):
+    """Build the aggregate cube for a long-format housing table.
+
+    When ``previous`` is given (the cube of the prior dataset version), only
+    years whose rows changed -- normally just the months appended since --
+    are re-aggregated, yearly and monthly; the rest is reused as is. A
+    HousingIndex over ``long`` turns picking those years' rows into slices
+    instead of a scan. The trend analytics span the whole history and are
+    always recomputed.
+    """
+    long = _canonical_dtypes(long)
+    fingerprint = _year_fingerprint(long)
+
+    if previous is None:
+        yearly = _aggregate_years(long)
+        months = _aggregate_months(long)
+    else:
+        common = fingerprint.index.intersection(previous.fingerprint.index)
+        same = (
+            fingerprint.loc[common]
+            .eq(previous.fingerprint.loc[common])
+            .all(axis=1)
+        )
+        unchanged_years = common[same.to_numpy()]
+        kept = previous.yearly[
+            previous.yearly.index.get_level_values("Year").isin(unchanged_years)
+        ]
+        # Re-code the reused rows onto this version's Location categories
+        kept.index = kept.index.remove_unused_levels()
+        kept.index = kept.index.set_levels(
+            kept.index.levels[0].astype(long["Location"].dtype), level="Location"
+        )
+        changed_years = fingerprint.index.difference(unchanged_years)
+        if index is not None:
+            changed_rows = _canonical_dtypes(index.years(changed_years))
+        else:
+            changed_rows = long[long["Year"].isin(changed_years)]
+        changed = _aggregate_years(changed_rows)
+        yearly = pd.concat([kept, changed]).sort_index()
+        kept_years = set(unchanged_years)
+        months = {
+            date: tables for date, tables in previous.months.items()
+            if date.year in kept_years
+        }
+        months.update(_aggregate_months(changed_rows))
+
+    return HousingCube(yearly, fingerprint, months, build_analytics(long))
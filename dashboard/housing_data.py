@@ -0,0 +1,522 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from housing_cube import build_cube
+from housing_index import HousingIndex
+
+try:
+    import pyarrow  # noqa: F401  (only needed for the Parquet sidecar cache)
+except ImportError:
+    pyarrow = None
+
+BASE_PATH = Path(__file__).resolve().parent
+DATA_PATH = BASE_PATH / "data"
+CACHE_PATH = DATA_PATH / ".cache"
+HOUSING_CSV = DATA_PATH / "Toronto 2015-2025 - MLS_Google_MLS_FULL.csv"
+LOCATION_COORDS_CSV = DATA_PATH / "location_coords.csv"
+
+# Set HOUSING_DATA_CACHE=0 to always parse the CSV
+USE_CACHE = os.environ.get("HOUSING_DATA_CACHE", "1") != "0"
+
+# Set HOUSING_DATA_MMAP=1 to share one memory-mapped copy of the rows (wide and
+# long format) between workers; the cube and analytics stay per worker
+USE_MMAP = os.environ.get("HOUSING_DATA_MMAP", "0") == "1"
+
+# Set HOUSING_COMPACT_DTYPES=1 to downcast the in-memory frame
+USE_COMPACT = os.environ.get("HOUSING_COMPACT_DTYPES", "0") == "1"
+
+# Set HOUSING_BACKEND=sqlite to push chart aggregations down to SQLite
+BACKEND = os.environ.get("HOUSING_BACKEND", "pandas")
+
+# Set HOUSING_DATA_LAYOUT=partitioned to read data/partitions/ instead of the CSV,
+# or HOUSING_DATA_LAYOUT=snapshots to read the current data/snapshots/ version
+LAYOUT = os.environ.get("HOUSING_DATA_LAYOUT", "csv")
+
+# Set HOUSING_DEBUG=1 to fail loudly when a renderer modifies the shared dataset
+DEBUG = os.environ.get("HOUSING_DEBUG", "0") == "1"
+
+CATEGORY_COLUMNS = ["Location", "Location_norm"]
+
+# Property types in display order, and the column prefix each one uses
+PROPERTY_TYPES = ["Composite", "Detached", "Semi-Detached", "Townhouse", "Apartment"]
+PROPERTY_TYPE_PREFIXES = {
+    "Composite": "Comp",
+    "Detached": "SFDetach",
+    "Semi-Detached": "SFAttach",
+    "Townhouse": "THouse",
+    "Apartment": "Apart",
+}
+BENCHMARK_COLUMNS = [
+    "CompBenchmark",
+    "SFDetachBenchmark",
+    "SFAttachBenchmark",
+    "THouseBenchmark",
+    "ApartBenchmark",
+]
+
+
+def read_housing_data(csv_path=HOUSING_CSV, use_cache=USE_CACHE):
+    """Load housing data, from the Parquet sidecar cache when it is fresh.
+
+    The cache is keyed by a hash of the CSV contents, so editing or
+    replacing the CSV always triggers a re-parse. Without pyarrow the CSV
+    is parsed every time.
+    """
+    csv_path = Path(csv_path)
+    if not use_cache or pyarrow is None:
+        return _parse_housing_csv(csv_path)
+
+    cache_path = _cache_path(csv_path, _source_hash(csv_path))
+    if cache_path.exists():
+        try:
+            return _from_cache_frame(pd.read_parquet(cache_path))
+        except Exception as e:
+            print(f"Ignoring unreadable cache {cache_path.name}: {e}")
+
+    df = _parse_housing_csv(csv_path)
+    try:
+        _write_cache(_to_cache_frame(df), cache_path)
+    except OSError as e:
+        print(f"Could not write cache {cache_path.name}: {e}")
+    return df
+
+
+def _parse_housing_csv(csv_path):
+    return prepare_housing_frame(pd.read_csv(csv_path))
+
+
+def prepare_housing_frame(df):
+    """Preprocess dates and normalized location names on raw MLS rows."""
+
+    # Ensure Date column is datetime
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df["Year"] = df["Date"].dt.year
+
+    # Normalize location names
+    df["Location_norm"] = (
+        df["Location"].astype(str)
+        .str.lower()
+        .str.replace(r"^(city of |town of |township of )", "", regex=True)
+        .str.strip()
+    )
+
+    # Clean column names of leading/trailing spaces
+    df.columns = df.columns.str.strip()
+
+    return df
+
+
+def _source_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def _cache_path(csv_path, digest):
+    return CACHE_PATH / f"{csv_path.stem}.{digest}.parquet"
+
+
+def _to_cache_frame(df):
+    """Typed storage copy: categorical locations, float32 benchmarks."""
+    cached = df.drop(columns=["Year"])
+    for col in CATEGORY_COLUMNS:
+        cached[col] = cached[col].astype("category")
+    for col in BENCHMARK_COLUMNS:
+        # A header-only CSV parses every column as object
+        if not pd.api.types.is_float_dtype(cached[col]):
+            continue
+        values = cached[col].to_numpy()
+        finite = values[~np.isnan(values)]
+        # float32 holds whole dollar amounts exactly below 2**24
+        if (finite == np.round(finite)).all() and (np.abs(finite) < 2**24).all():
+            cached[col] = cached[col].astype("float32")
+    return cached
+
+
+def _from_cache_frame(cached):
+    """Restore the exact frame _parse_housing_csv() returns."""
+    df = cached
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype(object).infer_objects()
+    for col in BENCHMARK_COLUMNS:
+        df[col] = df[col].astype("float64")
+    df.insert(df.columns.get_loc("Date") + 1, "Year", df["Date"].dt.year)
+    return df
+
+
+def _write_cache(cached, cache_path):
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    cached.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, cache_path)
+
+    # Drop caches of older versions of the same CSV
+    stem = cache_path.name.rsplit(".", 2)[0]
+    for old in cache_path.parent.glob(f"{stem}.*.parquet"):
+        if old != cache_path:
+            old.unlink(missing_ok=True)
+
+
+def compact_dtypes(df):
+    """Return a copy of the housing frame with the smallest lossless-enough dtypes.
+
+    Whole-dollar benchmarks become nullable Int32, index and YoY columns
+    float32, locations categoricals and Year int16. Chart aggregations upcast
+    to float64, so the figures are identical to the default profile.
+    """
+    compact = df.copy()
+    for col in compact.columns:
+        if col in CATEGORY_COLUMNS:
+            compact[col] = compact[col].astype("category")
+        elif col == "Year":
+            if compact[col].notna().all():
+                compact[col] = compact[col].astype("int16")
+        elif not pd.api.types.is_float_dtype(compact[col]):
+            # A header-only CSV parses every metric column as object
+            continue
+        elif col in BENCHMARK_COLUMNS:
+            values = compact[col].to_numpy()
+            finite = values[~np.isnan(values)]
+            if (finite == np.round(finite)).all() and (np.abs(finite) < 2**31).all():
+                compact[col] = compact[col].astype("Int32")
+            else:
+                compact[col] = compact[col].astype("float32")
+        elif col.endswith(("Index", "YoYChange")):
+            compact[col] = compact[col].astype("float32")
+    return compact
+
+
+def frame_megabytes(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def map_housing_data(csv_path=HOUSING_CSV):
+    """Map the housing data and its long-format table read-only from .npy files.
+
+    Returns ``(df, long)``. Both are materialized once per CSV version, the
+    long table in a ``long`` subdirectory, and every worker maps the same
+    files, so the OS page cache holds a single copy of the rows no matter
+    how many uvicorn workers are running. Text columns are stored as
+    categorical codes plus a small table of categories. The cube and the
+    analytics are aggregates and are still built per worker.
+    """
+    csv_path = Path(csv_path)
+    mmap_dir = CACHE_PATH / f"{csv_path.stem}.{_source_hash(csv_path)}.mmap"
+    if not (mmap_dir / "long").exists():
+        # Also replaces a directory written before the long table was mapped
+        shutil.rmtree(mmap_dir, ignore_errors=True)
+        _materialize_columns(read_housing_data(csv_path), mmap_dir)
+    return _map_columns(mmap_dir), _map_columns(mmap_dir / "long")
+
+
+def _write_columns(df, directory):
+    directory.mkdir()
+    layout = []
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        if values.dtype.kind in "biufcmM":
+            np.save(directory / f"{i}.npy", values.to_numpy())
+            layout.append({"name": col, "kind": "array"})
+        else:
+            categorical = pd.Categorical(values)
+            np.save(directory / f"{i}.codes.npy", categorical.codes)
+            np.save(directory / f"{i}.categories.npy", categorical.categories.to_numpy(dtype=str))
+            layout.append({"name": col, "kind": "category"})
+    (directory / "columns.json").write_text(json.dumps(layout))
+
+
+def _materialize_columns(df, mmap_dir):
+    mmap_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = mmap_dir.with_name(f"{mmap_dir.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    _write_columns(df, tmp_dir)
+    _write_columns(to_long_format(df), tmp_dir / "long")
+
+    try:
+        os.rename(tmp_dir, mmap_dir)
+    except OSError:
+        # Another worker published the same version first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+
+    stem = mmap_dir.name.rsplit(".", 2)[0]
+    for old in mmap_dir.parent.glob(f"{stem}.*.mmap"):
+        if old != mmap_dir:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def _map_columns(mmap_dir):
+    layout = json.loads((mmap_dir / "columns.json").read_text())
+    columns = {}
+    for i, spec in enumerate(layout):
+        if spec["kind"] == "array":
+            columns[spec["name"]] = np.load(mmap_dir / f"{i}.npy", mmap_mode="r")
+        else:
+            codes = np.load(mmap_dir / f"{i}.codes.npy", mmap_mode="r")
+            categories = np.load(mmap_dir / f"{i}.categories.npy").astype(object)
+            columns[spec["name"]] = pd.Categorical.from_codes(
+                codes, dtype=pd.CategoricalDtype(categories), validate=False
+            )
+    return pd.DataFrame(columns, copy=False)
+
+
+def to_long_format(df):
+    """Reshape the wide MLS frame into one row per Location × Date × PropertyType.
+
+    Location and PropertyType are categoricals, so every aggregation over
+    property types is a single groupby on the result.
+    """
+    n_rows = len(df)
+    n_types = len(PROPERTY_TYPES)
+    prefixes = [PROPERTY_TYPE_PREFIXES[t] for t in PROPERTY_TYPES]
+
+    def stacked(suffix):
+        # Keep the dtype of the wide columns (float64, or Int32/float32 when compact)
+        columns = [df[f"{prefix}{suffix}"] for prefix in prefixes]
+        values = np.concatenate(
+            [col.to_numpy(dtype="float64", na_value=np.nan) for col in columns]
+        )
+        return pd.Series(values).astype(columns[0].dtype)
+
+    locations = pd.Categorical(df["Location"])
+    return pd.DataFrame({
+        "Location": pd.Categorical.from_codes(
+            np.tile(locations.codes, n_types), dtype=locations.dtype
+        ),
+        "Date": np.tile(df["Date"].to_numpy(), n_types),
+        "Year": np.tile(df["Year"].to_numpy(), n_types),
+        "PropertyType": pd.Categorical.from_codes(
+            np.repeat(np.arange(n_types), n_rows), categories=PROPERTY_TYPES
+        ),
+        "Index": stacked("Index"),
+        "Benchmark": stacked("Benchmark"),
+        "YoY": stacked("YoYChange"),
+    })
+
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class HousingDataset:
+    """One parsed copy of the housing CSV, shared read-only by every session.
+
+    Summary stats used by the dashboard value boxes, the long-format table,
+    its (Date, Location) index and the aggregate cube are computed once at
+    load so charts never have to reshape or regroup rows. Passing the
+    previous dataset lets the cube reuse the years that did not change and
+    slice the changed ones out of the index.
+
+    The frames are pre-typed (datetime Date, Year derived once) and shared
+    by every session, so ``df``, ``long`` and ``coords`` (like the cube's
+    tables) are handed out as copy-on-write views: a renderer that writes
+    to one only changes its own copy, and no data is copied until it does.
+    """
+
+    __slots__ = (
+        "_df", "_long", "index", "cube", "_coords", "stamp",
+        "total_listings", "n_locations", "n_periods",
+    )
+
+    def __init__(self, df, stamp, previous=None, long=None):
+        if long is None:
+            long = to_long_format(df)
+        index = HousingIndex(long)
+        object.__setattr__(self, "_df", df)
+        object.__setattr__(self, "_long", long)
+        object.__setattr__(self, "index", index)
+        object.__setattr__(self, "cube", build_cube(long, previous and previous.cube, index))
+        object.__setattr__(self, "_coords", pd.read_csv(LOCATION_COORDS_CSV))
+        object.__setattr__(self, "stamp", stamp)
+        object.__setattr__(self, "total_listings", len(df))
+        object.__setattr__(self, "n_locations", df["Location"].nunique())
+        object.__setattr__(self, "n_periods", df["Date"].nunique())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("HousingDataset is read-only")
+
+    @property
+    def df(self):
+        return self._df.copy(deep=False)
+
+    @property
+    def long(self):
+        return self._long.copy(deep=False)
+
+    @property
+    def coords(self):
+        return self._coords.copy(deep=False)
+
+
+def _shared_frames(dataset):
+    """Every DataFrame/Series held by a dataset and its cube, by name.
+
+    Frames inside dicts and tuples (such as the cube's monthly tables) are
+    included too.
+    """
+    frames = {}
+
+    def collect(name, value):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            frames[name] = value
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                collect(f"{name}[{key}]", item)
+        elif isinstance(value, tuple):
+            for i, item in enumerate(value):
+                collect(f"{name}[{i}]", item)
+
+    cube = getattr(dataset, "cube", None)
+    owners = (
+        (dataset, ""),
+        (cube, "cube."),
+        (getattr(cube, "analytics", None), "cube.analytics."),
+    )
+    for owner, prefix in owners:
+        if owner is None:
+            continue
+        names = getattr(owner, "__slots__", None) or vars(owner)
+        for name in names:
+            collect(prefix + name.lstrip("_"), getattr(owner, name, None))
+    return frames
+
+
+def _frame_fingerprint(frame):
+    if isinstance(frame, pd.Series):
+        frame = frame.to_frame()
+    values = int(pd.util.hash_pandas_object(frame).sum())
+    # Buffer addresses also catch a column replaced by equal values, such as
+    # pd.to_datetime() run again on the already-typed Date
+    buffers = tuple(
+        frame.iloc[:, i].to_numpy().__array_interface__["data"][0]
+        for i, dtype in enumerate(frame.dtypes) if isinstance(dtype, np.dtype)
+    )
+    return tuple(map(str, frame.columns)), tuple(map(str, frame.dtypes)), values, buffers
+
+
+@contextmanager
+def read_only(dataset, renderer):
+    """Run ``renderer`` against the shared dataset, checking it leaves it untouched.
+
+    Renderers only get copy-on-write views, so this is a debugging aid: with
+    HOUSING_DEBUG=1 every shared frame is fingerprinted (columns, dtypes and
+    a hash of the values) before and after, and any change, such as a write
+    that reached a cube's internal tables, raises a RuntimeError naming the
+    renderer. Otherwise this costs nothing.
+    """
+    if not DEBUG:
+        yield dataset
+        return
+
+    before = {name: _frame_fingerprint(f) for name, f in _shared_frames(dataset).items()}
+    yield dataset
+    after = {name: _frame_fingerprint(f) for name, f in _shared_frames(dataset).items()}
+    changed = sorted(name for name in before if before[name] != after.get(name))
+    if changed:
+        raise RuntimeError(
+            f"{renderer} modified the shared dataset ({', '.join(changed)}); "
+            "renderers must copy before writing"
+        )
+
+
+_dataset = None
+_dataset_lock = threading.Lock()
+
+
+def _load_dataset(source, stamp, previous):
+    if BACKEND == "sqlite":
+        from housing_db import SqliteHousingDataset, ensure_database
+
+        # (Re)building from the CSV rewrites the file, so stamp it afterwards
+        return SqliteHousingDataset(ensure_database(source), _sqlite_stamp(source))
+
+    if USE_MMAP and LAYOUT != "partitioned":
+        df, long = map_housing_data(source)
+        return HousingDataset(df, stamp, previous=previous, long=long)
+
+    if LAYOUT == "partitioned":
+        from housing_partitions import read_partitions
+
+        df = read_partitions(source.parent)
+    else:
+        df = read_housing_data(source)
+    if USE_COMPACT:
+        before = frame_megabytes(df)
+        df = compact_dtypes(df)
+        print(f"Compact dtypes: {before:.2f} MB -> {frame_megabytes(df):.2f} MB")
+    return HousingDataset(df, stamp, previous=previous)
+
+
+def _sqlite_stamp(db_path):
+    # The database, plus the CSV ensure_database() rebuilds it from
+    db_stamp = _file_stamp(db_path) if db_path.exists() else None
+    return db_stamp, _file_stamp(HOUSING_CSV)
+
+
+def _current_source():
+    """Where the dataset lives right now, and a cheap stamp of its version.
+
+    Only stats files, so sessions can poll it; building or rebuilding the
+    SQLite database is left to _load_dataset().
+    """
+    if BACKEND == "sqlite":
+        from housing_db import DB_PATH
+
+        return DB_PATH, _sqlite_stamp(DB_PATH)
+    elif LAYOUT == "partitioned":
+        from housing_partitions import manifest_path
+
+        source = manifest_path()
+    elif LAYOUT == "snapshots":
+        from housing_snapshots import current_version, snapshot_path
+
+        version = current_version()
+        if version is None:
+            raise FileNotFoundError("No snapshot published yet; run housing_snapshots.py")
+        # Snapshots are immutable, so the version itself is the stamp
+        return snapshot_path(version), version
+    else:
+        source = HOUSING_CSV
+    return source, _file_stamp(source)
+
+
+def dataset_stamp():
+    """Stamp of the current dataset source, cheap enough for sessions to poll."""
+    return _current_source()[1]
+
+
+def get_dataset():
+    """Return the process-wide dataset, reloading only if its source changed on disk.
+
+    The source is the CSV, the partition manifest with
+    HOUSING_DATA_LAYOUT=partitioned, the current snapshot with
+    HOUSING_DATA_LAYOUT=snapshots, or the SQLite database with
+    HOUSING_BACKEND=sqlite.
+    """
+    global _dataset
+
+    source, stamp = _current_source()
+    dataset = _dataset
+    if dataset is not None and dataset.stamp == stamp:
+        return dataset
+
+    with _dataset_lock:
+        if _dataset is None or _dataset.stamp != stamp:
+            try:
+                _dataset = _load_dataset(source, stamp, _dataset)
+            except FileNotFoundError:
+                # The snapshot was collected after CURRENT moved on; load the new one
+                source, stamp = _current_source()
+                _dataset = _load_dataset(source, stamp, _dataset)
+        return _dataset
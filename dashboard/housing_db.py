@@ -0,0 +1,434 @@
+import math
+import os
+import sqlite3
+import threading
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from housing_analytics import ROLLING_WINDOWS
+from housing_cube import period_date
+from housing_data import (
+    DATA_PATH,
+    HOUSING_CSV,
+    LOCATION_COORDS_CSV,
+    PROPERTY_TYPE_PREFIXES,
+    PROPERTY_TYPES,
+    read_housing_data,
+)
+
+DB_PATH = DATA_PATH / "housing.sqlite"
+
+MLS_COLUMNS = ["Location", "Date", "Year"] + [
+    f"{PROPERTY_TYPE_PREFIXES[t]}{suffix}"
+    for t in PROPERTY_TYPES
+    for suffix in ("Index", "Benchmark", "YoYChange")
+]
+
+# mean/min/max/sum as SQL; TOTAL() is 0.0 for all-NULL groups, like pandas sum
+SQL_STATS = {"mean": "AVG", "min": "MIN", "max": "MAX", "sum": "TOTAL"}
+
+MLS_TABLE = "CREATE TABLE IF NOT EXISTS mls (\n" + ",\n".join(
+    f'"{col}" ' + {"Location": "TEXT", "Date": "TEXT", "Year": "INTEGER"}.get(col, "REAL")
+    for col in MLS_COLUMNS
+) + "\n)"
+
+LONG_VIEW = "CREATE VIEW IF NOT EXISTS mls_long AS\n" + "\nUNION ALL\n".join(
+    f"""SELECT Location, Date, Year, {order} AS TypeOrder, '{t}' AS PropertyType,
+       {prefix}Index AS "Index", {prefix}Benchmark AS Benchmark, {prefix}YoYChange AS YoY
+FROM mls"""
+    for order, (t, prefix) in enumerate((t, PROPERTY_TYPE_PREFIXES[t]) for t in PROPERTY_TYPES)
+)
+
+# One row per Location × PropertyType × month with a reported (positive)
+# Index, duplicate rows averaged. Month counts calendar months, so RANGE
+# frames over it skip months a report is missing for
+MONTHLY_VIEW = """CREATE VIEW IF NOT EXISTS mls_monthly AS
+SELECT Location, TypeOrder, PropertyType, Date,
+       CAST(substr(Date, 1, 4) AS INTEGER) * 12 + CAST(substr(Date, 6, 2) AS INTEGER) AS Month,
+       AVG("Index") AS "Index", AVG(YoY) AS ReportedYoY
+FROM mls_long WHERE Date IS NOT NULL AND Location IS NOT NULL
+GROUP BY Location, TypeOrder, PropertyType, Date
+HAVING AVG("Index") > 0"""
+
+# The HousingAnalytics metrics as window functions. A return is NULL unless
+# the month it compares with has an Index
+RETURNS_VIEW = """CREATE VIEW IF NOT EXISTS mls_returns AS
+SELECT Location, TypeOrder, PropertyType, Date, Month, "Index", ReportedYoY,
+       ("Index" / MAX("Index") OVER month_ago - 1) * 100 AS MoM,
+       ("Index" / MAX("Index") OVER year_ago - 1) * 100 AS YoY
+FROM mls_monthly
+WINDOW series AS (PARTITION BY Location, TypeOrder, PropertyType ORDER BY Month),
+       month_ago AS (series RANGE BETWEEN 1 PRECEDING AND 1 PRECEDING),
+       year_ago AS (series RANGE BETWEEN 12 PRECEDING AND 12 PRECEDING)"""
+
+# Rolling windows on top, in a view of their own so charts of returns do
+# not pay for them. An N-month average or volatility (sample standard
+# deviation of MoM) is NULL unless all N months have a value
+_ROLLING_COLUMNS = "".join(
+    f""",
+       CASE WHEN COUNT(*) OVER last{n} = {n} THEN AVG("Index") OVER last{n} END AS Avg{n},
+       CASE WHEN COUNT(MoM) OVER last{n} = {n} THEN sqrt(max(0, (
+           SUM(MoM * MoM) OVER last{n} - SUM(MoM) OVER last{n} * SUM(MoM) OVER last{n} / {n}
+       ) / {n - 1})) END AS Vol{n}"""
+    for n in ROLLING_WINDOWS
+)
+_ROLLING_WINDOWS = "".join(
+    f",\n       last{n} AS (series RANGE BETWEEN {n - 1} PRECEDING AND CURRENT ROW)"
+    for n in ROLLING_WINDOWS
+)
+TREND_VIEW = f"""CREATE VIEW IF NOT EXISTS mls_trend AS
+SELECT *{_ROLLING_COLUMNS}
+FROM mls_returns
+WINDOW series AS (PARTITION BY Location, TypeOrder, PropertyType ORDER BY Month){_ROLLING_WINDOWS}"""
+
+RETURN_COLUMNS = ["Index", "MoM", "YoY", "ReportedYoY"]
+TREND_COLUMNS = RETURN_COLUMNS + [
+    f"{metric}{n}" for n in ROLLING_WINDOWS for metric in ("Avg", "Vol")
+]
+
+_build_lock = threading.Lock()
+
+
+def connect(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    # sqrt() is only built in where SQLite was compiled with its math functions
+    try:
+        conn.execute("SELECT sqrt(1)")
+    except sqlite3.OperationalError:
+        conn.create_function("sqrt", 1, math.sqrt, deterministic=True)
+    return conn
+
+
+def create_schema(conn):
+    """Create the mls table, its indexes and views, and the meta table if missing.
+
+    Safe to call on every open, so databases built before a view was added
+    pick it up.
+    """
+    with conn:
+        conn.execute(MLS_TABLE)
+        conn.execute("CREATE INDEX IF NOT EXISTS mls_location ON mls (Location, Date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS mls_date ON mls (Date, Location)")
+        conn.execute("CREATE INDEX IF NOT EXISTS mls_year ON mls (Year)")
+        conn.execute(LONG_VIEW)
+        conn.execute(MONTHLY_VIEW)
+        conn.execute(RETURNS_VIEW)
+        conn.execute(TREND_VIEW)
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _to_sql_rows(df):
+    rows = df.reindex(columns=MLS_COLUMNS).copy()
+    rows["Date"] = pd.to_datetime(rows["Date"]).dt.strftime("%Y-%m-%d")
+    rows["Year"] = pd.to_datetime(rows["Date"]).dt.year
+    return rows
+
+
+def build_database(df, coords, db_path=DB_PATH, source_stamp=None):
+    """Write the MLS history and location coordinates to a fresh SQLite file.
+
+    The file is built next to ``db_path`` and moved into place, so workers
+    starting at the same time never open a half-written database.
+    ``source_stamp`` records which version of the CSV the rows came from.
+    """
+    db_path = Path(db_path)
+    tmp_path = db_path.with_name(f"{db_path.name}.{os.getpid()}.tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    try:
+        conn = connect(tmp_path)
+        create_schema(conn)
+        with conn:
+            _to_sql_rows(df).to_sql("mls", conn, index=False, if_exists="append")
+            coords.to_sql("location_coords", conn, index=False)
+            if source_stamp is not None:
+                conn.execute("INSERT INTO meta VALUES ('source_stamp', ?)", (source_stamp,))
+        conn.close()
+        os.replace(tmp_path, db_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def upsert_rows(conn, df):
+    """Insert rows, replacing any existing rows for the same Location and Date.
+
+    Returns the number of rows written. Rows without a Location are skipped
+    since there is nothing to key them on. The database no longer mirrors a
+    CSV afterwards, so ensure_database() stops rebuilding it from one.
+    """
+    rows = _to_sql_rows(df[df["Location"].notna()])
+    # A batch can repeat a key (the same region on several report pages);
+    # the last row wins, as it would against a row already stored
+    rows = rows.drop_duplicates(["Location", "Date"], keep="last")
+    keys = list(rows[["Location", "Date"]].itertuples(index=False, name=None))
+    with conn:
+        conn.executemany("DELETE FROM mls WHERE Location = ? AND Date = ?", keys)
+        rows.to_sql("mls", conn, index=False, if_exists="append")
+        conn.execute("DELETE FROM meta WHERE key = 'source_stamp'")
+    return len(rows)
+
+
+def read_latest(conn, columns):
+    """Location, Date and ``columns`` of each location's most recent dated row."""
+    selected = ", ".join(f'mls."{col}"' for col in columns)
+    return _query(
+        conn,
+        f"""SELECT mls.Location, mls.Date, {selected} FROM mls
+            JOIN (SELECT Location, MAX(Date) AS Date FROM mls
+                  WHERE Date IS NOT NULL GROUP BY Location) AS last
+            USING (Location, Date)""",
+    )
+
+
+def _query(conn, sql, params=()):
+    return pd.read_sql_query(sql, conn, params=params)
+
+
+def _parse_column(column):
+    metric, stat = column.rsplit("_", 1)
+    return f'{SQL_STATS[stat]}("{metric}")'
+
+
+class SqliteHousingCube:
+    """HousingCube look-alike whose aggregations run inside SQLite.
+
+    Only the aggregated results are pulled into pandas, so memory stays flat
+    however many regions and years the ``mls`` table holds.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._months = {}
+
+    def _read(self, sql, params=()):
+        with connect(self.db_path) as conn:
+            result = _query(conn, sql, params)
+        conn.close()
+        return result
+
+    @cached_property
+    def dates(self):
+        result = self._read("SELECT DISTINCT Date FROM mls WHERE Date IS NOT NULL ORDER BY Date")
+        return [pd.Timestamp(date) for date in result["Date"]]
+
+    @cached_property
+    def latest_date(self):
+        return self.dates[-1] if self.dates else None
+
+    @property
+    def latest_by_type(self):
+        return self.by_type(self.latest_date)
+
+    @property
+    def latest_by_location(self):
+        return self.by_location(self.latest_date)
+
+    def period_date(self, year, month=None):
+        return period_date(self.dates, year, month)
+
+    def _month(self, date):
+        """Both snapshot tables for one month, queried once per dataset version."""
+        if date not in self._months:
+            params = (date.strftime("%Y-%m-%d"),)
+            stats = ", ".join(f'{fn}(Benchmark) AS "{stat}"' for stat, fn in SQL_STATS.items())
+            by_type = self._read(
+                f"""SELECT PropertyType, {stats} FROM mls_long WHERE Date = ?
+                    GROUP BY TypeOrder, PropertyType ORDER BY TypeOrder""",
+                params,
+            )
+            by_location = self._read(
+                """SELECT Location, PropertyType, AVG(Benchmark) AS Benchmark FROM mls_long
+                   WHERE Date = ? AND Location IS NOT NULL
+                   GROUP BY Location, TypeOrder, PropertyType
+                   ORDER BY Location, TypeOrder""",
+                params,
+            )
+            self._months[date] = (by_type.set_index("PropertyType").astype("float64"), by_location)
+        return self._months[date]
+
+    def by_type(self, date):
+        return self._month(date)[0].copy(deep=False)
+
+    def by_location(self, date):
+        return self._month(date)[1].copy(deep=False)
+
+    @cached_property
+    def analytics(self):
+        return SqliteHousingAnalytics(self)
+
+    def years(self):
+        result = self._read("SELECT DISTINCT Year FROM mls WHERE Year IS NOT NULL ORDER BY Year")
+        return result["Year"].astype("int32").tolist()
+
+    def yearly_values(self, property_type, column="Benchmark_mean"):
+        result = self._read(
+            f"""SELECT Location, Year, {_parse_column(column)} AS "{column}" FROM mls_long
+                WHERE PropertyType = ? AND Location IS NOT NULL AND Year IS NOT NULL
+                GROUP BY Location, Year ORDER BY Location, Year""",
+            (property_type,),
+        )
+        return result.astype({"Year": "int32"})
+
+    def yearly_by_type(self, year, column="Benchmark_mean"):
+        result = self._read(
+            f"""SELECT Location, PropertyType, {_parse_column(column)} AS "{column}"
+                FROM mls_long WHERE Year = ? AND Location IS NOT NULL
+                GROUP BY Location, TypeOrder, PropertyType""",
+            (int(year),),
+        )
+        if result.empty:
+            return pd.DataFrame()
+        table = result.pivot(index="Location", columns="PropertyType", values=column)
+        return table.reindex(columns=PROPERTY_TYPES)
+
+    def top_locations(self, year, n, property_type="Composite", column="Benchmark_mean"):
+        result = self._read(
+            f"""SELECT Location, {_parse_column(column)} AS value FROM mls_long
+                WHERE PropertyType = ? AND Year = ? AND Location IS NOT NULL
+                GROUP BY Location ORDER BY value DESC LIMIT ?""",
+            # LIMIT -1 is no limit
+            (property_type, int(year), -1 if n is None else n),
+        )
+        return result["Location"]
+
+
+def _trend_view(column):
+    # The cheapest view holding the column
+    if column in RETURN_COLUMNS:
+        return "mls_returns"
+    if column in TREND_COLUMNS:
+        return "mls_trend"
+    raise KeyError(column)
+
+
+class SqliteHousingAnalytics:
+    """HousingAnalytics look-alike over the mls_returns and mls_trend views.
+
+    Returns and rolling windows are window functions inside SQLite, so only
+    the table a chart asks for is pulled into pandas. Each type trend is
+    queried once per cube, i.e. once per dataset version.
+    """
+
+    def __init__(self, cube):
+        self._read = cube._read
+        self._type_means = {}
+
+    def type_trend(self, column, end=None):
+        """Date × PropertyType table of a column's mean across locations, up to ``end``."""
+        if column not in self._type_means:
+            result = self._read(
+                f"""SELECT Date, PropertyType, AVG("{column}") AS value FROM {_trend_view(column)}
+                    GROUP BY Date, TypeOrder, PropertyType"""
+            )
+            result["Date"] = pd.to_datetime(result["Date"])
+            table = result.pivot(index="Date", columns="PropertyType", values="value")
+            self._type_means[column] = table.reindex(
+                columns=[t for t in PROPERTY_TYPES if t in table.columns]
+            ).astype("float64")
+        table = self._type_means[column]
+        return (table if end is None else table.loc[:end]).copy(deep=False)
+
+    def location_table(self, column, locations, start, end, property_type="Composite"):
+        """Location × Date table of one property type's ``column`` between two dates."""
+        locations = list(locations)
+        result = self._read(
+            f"""SELECT Location, Date, "{column}" AS value FROM {_trend_view(column)}
+                WHERE PropertyType = ? AND Location IN ({", ".join("?" * len(locations))})
+                AND Date BETWEEN ? AND ? AND "{column}" IS NOT NULL""",
+            (property_type, *locations, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")),
+        )
+        result["Date"] = pd.to_datetime(result["Date"])
+        table = result.pivot(index="Location", columns="Date", values="value").astype("float64")
+        return table.reindex([name for name in locations if name in table.index])
+
+    @cached_property
+    def cagr(self):
+        """CAGR (%) of each series from its first to its last Index value."""
+        result = self._read(
+            """SELECT DISTINCT Location, TypeOrder, PropertyType,
+                   FIRST_VALUE(Date) OVER history AS Start, LAST_VALUE(Date) OVER history AS End,
+                   FIRST_VALUE(Month) OVER history AS FirstMonth,
+                   LAST_VALUE(Month) OVER history AS LastMonth,
+                   FIRST_VALUE("Index") OVER history AS FirstIndex,
+                   LAST_VALUE("Index") OVER history AS LastIndex
+               FROM mls_monthly
+               WINDOW history AS (
+                   PARTITION BY Location, TypeOrder ORDER BY Month
+                   ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+               )
+               ORDER BY Location, TypeOrder"""
+        )
+        years = ((result["LastMonth"] - result["FirstMonth"]) / 12).to_numpy("float64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            growth = (result["LastIndex"] / result["FirstIndex"]).to_numpy() ** (1 / years) - 1
+        return pd.DataFrame({
+            "Location": result["Location"],
+            "PropertyType": pd.Categorical(result["PropertyType"], categories=PROPERTY_TYPES),
+            "Start": pd.to_datetime(result["Start"]),
+            "End": pd.to_datetime(result["End"]),
+            "CAGR": np.where(years > 0, growth * 100, np.nan),
+        })
+
+
+class SqliteHousingDataset:
+    """Dataset handle for the SQLite backend: value-box stats plus the SQL cube."""
+
+    def __init__(self, db_path, stamp):
+        self.db_path = db_path
+        self.stamp = stamp
+        self.cube = SqliteHousingCube(db_path)
+        with connect(db_path) as conn:
+            create_schema(conn)
+            self.total_listings, self.n_locations, self.n_periods = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT Location), COUNT(DISTINCT Date) FROM mls"
+            ).fetchone()
+            self._coords = _query(conn, "SELECT Location, LAT, LON FROM location_coords")
+        conn.close()
+
+    @property
+    def coords(self):
+        return self._coords.copy(deep=False)
+
+
+def _stored_stamp(db_path):
+    """The CSV stamp a database was built from.
+
+    None once the ingest has upserted into it, "" for a database built
+    before stamps were recorded.
+    """
+    with connect(db_path) as conn:
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'source_stamp'").fetchone()
+        except sqlite3.OperationalError:
+            # Built before source stamps were recorded
+            row = ("",)
+    conn.close()
+    return None if row is None else row[0]
+
+
+def ensure_database(db_path=DB_PATH, csv_path=HOUSING_CSV):
+    """Build the database from the CSV, again whenever the CSV has changed.
+
+    The CSV's mtime and size are stored in the database and compared on
+    every call. A database the ingest upserts into (see upsert_rows) no
+    longer records a stamp and is left as it is.
+    """
+    db_path = Path(db_path)
+    stamp = _source_stamp(csv_path)
+    if db_path.exists() and _stored_stamp(db_path) in (stamp, None):
+        return db_path
+
+    with _build_lock:
+        if not db_path.exists() or _stored_stamp(db_path) not in (stamp, None):
+            build_database(
+                read_housing_data(csv_path), pd.read_csv(LOCATION_COORDS_CSV), db_path, stamp
+            )
+    return db_path
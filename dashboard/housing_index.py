@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+
+class HousingIndex:
+    """Sorted (Date, Location) offset index over a housing frame.
+
+    The frame itself is not copied or reordered: the index keeps one
+    permutation that sorts rows by Date then Location, so a month or a year
+    is a contiguous slice of that permutation found by binary search, and a
+    location's history is a precomputed list of row positions. Works on the
+    wide MLS frame and on the long-format table alike.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+
+        dates = frame["Date"].to_numpy(dtype="datetime64[ns]")
+        locations = pd.Categorical(frame["Location"])
+        # NaT sorts first as int64, so undated rows end up before the offsets
+        self._order = np.lexsort((locations.codes, dates.view("int64")))
+        sorted_dates = dates[self._order]
+        n_undated = int(np.isnat(sorted_dates).sum())
+        self._order = self._order[n_undated:]
+        self._dates = sorted_dates[n_undated:]
+
+        self.dates = np.unique(self._dates)
+        self.latest_date = pd.Timestamp(self.dates[-1]) if len(self.dates) else None
+
+        # Positions in date order per location; code -1 is a missing Location
+        location_codes = locations.codes[self._order]
+        groups = pd.Series(location_codes).groupby(location_codes).indices
+        self._by_location = {
+            locations.categories[code]: self._order[positions]
+            for code, positions in groups.items()
+            if code >= 0
+        }
+
+        self._last_dates = pd.Series(
+            {name: pd.Timestamp(dates[rows[-1]]) for name, rows in self._by_location.items()},
+            dtype="datetime64[ns]",
+        )
+
+    def _offset(self, date, side):
+        date = pd.Timestamp(date).as_unit("ns").to_datetime64()
+        return np.searchsorted(self._dates, date, side=side)
+
+    def _rows(self, lo, hi):
+        return self.frame.take(self._order[lo:hi])
+
+    def month(self, date):
+        """Rows for one month (the Date value the reports are stamped with)."""
+        return self._rows(self._offset(date, "left"), self._offset(date, "right"))
+
+    def latest(self):
+        """Rows for the most recent month in the data."""
+        if self.latest_date is None:
+            return self.frame.iloc[0:0]
+        return self.month(self.latest_date)
+
+    def year(self, year):
+        """Rows for every month of one calendar year."""
+        return self._rows(
+            self._offset(pd.Timestamp(year=year, month=1, day=1), "left"),
+            self._offset(pd.Timestamp(year=year + 1, month=1, day=1), "left"),
+        )
+
+    def years(self, years):
+        """Rows for every month of several calendar years, in date order."""
+        return pd.concat([self.year(int(year)) for year in sorted(years)] or [self.frame.iloc[0:0]])
+
+    def location(self, name):
+        """A location's rows in date order (empty if the location is unknown)."""
+        rows = self._by_location.get(name)
+        if rows is None:
+            return self.frame.iloc[0:0]
+        return self.frame.take(rows)
+
+    def last_date(self, name):
+        """Most recent date recorded for a location, or None if it is unknown."""
+        rows = self._by_location.get(name)
+        return None if rows is None else self._last_dates[name]
+
+    def last_dates(self):
+        """Most recent date per location, as a Series indexed by Location."""
+        return self._last_dates
+
+    def latest_rows(self):
+        """Each location's most recent row, indexed by Location.
+
+        The whole row is taken, so a metric missing from that month stays
+        missing rather than falling back to an older month's value. Of
+        several rows for the same month the last one in the frame wins.
+        """
+        rows = [positions[-1] for positions in self._by_location.values()]
+        latest = self.frame.take(rows)
+        return latest.set_index(pd.Index(list(self._by_location), name="Location")).drop(columns="Location")
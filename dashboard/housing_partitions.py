@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from housing_data import DATA_PATH, HOUSING_CSV, prepare_housing_frame
+
+# One year=YYYY/month=MM/part.csv file per month, listed in manifest.json.
+# Run this module to split the monolithic CSV into partitions.
+PARTITIONS_PATH = DATA_PATH / "partitions"
+MANIFEST_NAME = "manifest.json"
+
+
+def manifest_path(root=PARTITIONS_PATH):
+    return Path(root) / MANIFEST_NAME
+
+
+def read_manifest(root=PARTITIONS_PATH):
+    path = manifest_path(root)
+    if not path.exists():
+        return {"partitions": []}
+    return json.loads(path.read_text())
+
+
+def _write_manifest(manifest, root):
+    manifest["partitions"].sort(key=lambda p: (p["year"], p["month"]))
+    path = manifest_path(root)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, path)
+
+
+def _file_sha256(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def append_partition(df_month, root=PARTITIONS_PATH):
+    """Append one month of rows to its partition and update the manifest.
+
+    All rows must share the same Date month. A new month creates a new file;
+    rows for a month that already exists are appended to its file.
+    """
+    root = Path(root)
+    dates = pd.to_datetime(df_month["Date"])
+    months = dates.dt.to_period("M").unique()
+    if len(months) != 1:
+        raise ValueError(f"append_partition expects one month of rows, got {len(months)}")
+    period = months[0]
+
+    relative = Path(f"year={period.year}") / f"month={period.month:02d}" / "part.csv"
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    rows = df_month.assign(Date=dates.dt.strftime("%Y-%m-%d"))
+    rows.to_csv(path, mode="a", header=not path.exists(), index=False)
+
+    manifest = read_manifest(root)
+    key = (period.year, period.month)
+    previous_rows = sum(
+        p["rows"] for p in manifest["partitions"] if (p["year"], p["month"]) == key
+    )
+    manifest["partitions"] = [
+        p for p in manifest["partitions"] if (p["year"], p["month"]) != key
+    ]
+    manifest["partitions"].append({
+        "year": period.year,
+        "month": period.month,
+        "path": relative.as_posix(),
+        "rows": previous_rows + len(rows),
+        "sha256": _file_sha256(path),
+    })
+    _write_manifest(manifest, root)
+    return path
+
+
+def partition_dataset(df, root=PARTITIONS_PATH):
+    """Split a full MLS frame into month partitions (undated rows are dropped)."""
+    dates = pd.to_datetime(df["Date"], errors="coerce")
+    undated = int(dates.isna().sum())
+    if undated:
+        print(f"Skipping {undated} rows without a Date")
+    for _, month_df in df[dates.notna()].groupby(dates.dt.to_period("M")):
+        append_partition(month_df, root)
+
+
+def read_partitions(root=PARTITIONS_PATH, years=None, max_workers=8):
+    """Read the partitioned history, optionally only some years, in parallel.
+
+    Returns the same preprocessed frame as read_housing_data().
+    """
+    root = Path(root)
+    partitions = read_manifest(root)["partitions"]
+    if years is not None:
+        years = set(years)
+        partitions = [p for p in partitions if p["year"] in years]
+    if not partitions:
+        raise FileNotFoundError(f"No partitions listed in {manifest_path(root)}")
+
+    paths = [root / p["path"] for p in partitions]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as pool:
+        frames = list(pool.map(pd.read_csv, paths))
+    return prepare_housing_frame(pd.concat(frames, ignore_index=True))
+
+
+if __name__ == "__main__":
+    if read_manifest()["partitions"]:
+        raise SystemExit(f"{PARTITIONS_PATH} already holds partitions")
+    partition_dataset(pd.read_csv(HOUSING_CSV))
+    print(f"Wrote {len(read_manifest()['partitions'])} partitions to {PARTITIONS_PATH}")
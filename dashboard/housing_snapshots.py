@@ -0,0 +1,143 @@
+import hashlib
+import os
+import shutil
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+from housing_data import CACHE_PATH, DATA_PATH, HOUSING_CSV
+
+# Immutable <sha256>.csv snapshots plus a CURRENT file naming the live one.
+# Run this module with a CSV path to publish it as the new current snapshot.
+SNAPSHOTS_PATH = DATA_PATH / "snapshots"
+CURRENT_NAME = "CURRENT"
+# <version>.<pid> lease files, one per snapshot a worker's sessions hold
+HOLDS_NAME = "holds"
+
+_refs = Counter()
+_refs_lock = threading.Lock()
+
+
+def _atomic_write_text(path, text):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(text)
+    os.replace(tmp_path, path)
+
+
+def snapshot_path(version, root=SNAPSHOTS_PATH):
+    return Path(root) / f"{version}.csv"
+
+
+def publish_snapshot(csv_path, root=SNAPSHOTS_PATH):
+    """Copy a CSV into an immutable content-hashed snapshot and make it current.
+
+    The snapshot is fully written before CURRENT is flipped with an atomic
+    rename, so a reader never sees a half-written file. Returns the version.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256()
+    with open(csv_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    version = digest.hexdigest()[:16]
+
+    path = snapshot_path(version, root)
+    if not path.exists():
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        shutil.copyfile(csv_path, tmp_path)
+        os.replace(tmp_path, path)
+
+    _atomic_write_text(root / CURRENT_NAME, version)
+    return version
+
+
+def current_version(root=SNAPSHOTS_PATH):
+    """Version named by CURRENT, or None if nothing has been published."""
+    try:
+        return (Path(root) / CURRENT_NAME).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _lease_path(version, root):
+    return Path(root) / HOLDS_NAME / f"{version}.{os.getpid()}"
+
+
+def _process_alive(pid):
+    if os.name == "nt":
+        # os.kill() would terminate it; keep the lease
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def retain(version, root=SNAPSHOTS_PATH):
+    """Mark a snapshot as in use by a session of this process.
+
+    The first hold in a process leaves a lease file, so collect_garbage()
+    in the other workers keeps the snapshot too.
+    """
+    with _refs_lock:
+        _refs[version] += 1
+        if _refs[version] == 1:
+            lease = _lease_path(version, root)
+            lease.parent.mkdir(parents=True, exist_ok=True)
+            lease.touch()
+
+
+def release(version, root=SNAPSHOTS_PATH):
+    """Drop a session's hold on a snapshot and collect unreferenced ones."""
+    with _refs_lock:
+        _refs[version] -= 1
+        if _refs[version] <= 0:
+            del _refs[version]
+            _lease_path(version, root).unlink(missing_ok=True)
+    collect_garbage(root)
+
+
+def _leased_versions(root):
+    """Versions leased by a live process; leases of workers that died are removed."""
+    leased = set()
+    for lease in (Path(root) / HOLDS_NAME).glob("*.*"):
+        version, _, pid = lease.name.rpartition(".")
+        if pid.isdigit() and _process_alive(int(pid)):
+            leased.add(version)
+        else:
+            lease.unlink(missing_ok=True)
+    return leased
+
+
+def collect_garbage(root=SNAPSHOTS_PATH):
+    """Delete snapshots that are neither current nor held by a session of any worker.
+
+    Holds are counted per process and published as lease files (see
+    retain()), so one worker never deletes a snapshot another worker's
+    sessions still show. A worker that loses the race to a deleted file
+    simply re-reads CURRENT. A snapshot's Parquet cache and memory-mapped
+    columns (named after its version) go with it.
+    """
+    root = Path(root)
+    current = current_version(root)
+    with _refs_lock:
+        keep = set(_refs) | {current}
+    keep |= _leased_versions(root)
+    for path in root.glob("*.csv"):
+        if path.stem not in keep:
+            path.unlink(missing_ok=True)
+            for cache in CACHE_PATH.glob(f"{path.stem}.*.parquet"):
+                cache.unlink(missing_ok=True)
+            for mmap_dir in CACHE_PATH.glob(f"{path.stem}.*.mmap"):
+                shutil.rmtree(mmap_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    source = Path(sys.argv[1]) if len(sys.argv) > 1 else HOUSING_CSV
+    print(f"Published {source.name} as snapshot {publish_snapshot(source)}")
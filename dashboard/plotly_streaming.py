@@ -27,7 +27,7 @@ def _to_json_repr(obj):
 
 
 def render_plotly_streaming(
-    fn=None, *, recreate_key=lambda: None, update=("layout", "data")
+    fn=None, *, recreate_key=lambda: None, update=("layout", "data"), theme=None
 ):
     """Custom decorator for Plotly streaming plots. This is similar to
     shinywidgets.render_widget, except:
@@ -43,10 +43,15 @@ def render_plotly_streaming(
         function changes, the plot will be recreated from scratch. This is useful for
         changes that render_plotly_streaming can't handle well, such as changing the
         number of traces in a plot.
+    theme : callable, optional
+        A function that returns a dict of layout properties (e.g. template and
+        paper_bgcolor). It is applied on top of the figure, and when only its
+        value changes the widget's layout is patched without calling the
+        render function again.
     """
 
     if fn is not None:
-        return render_plotly_streaming(recreate_key=recreate_key)(fn)
+        return render_plotly_streaming(recreate_key=recreate_key, theme=theme)(fn)
 
     def decorator(func):
         @deduplicate
@@ -61,19 +66,39 @@ def render_plotly_streaming(
             with reactive.isolate():
                 fig = func()
                 widget = go.FigureWidget(fig)
+                if theme is not None:
+                    widget.update_layout(theme())
 
             @reactive.Effect
             def update_plotly_data():
                 f_new = func()
+                if "data" in update and len(widget.data) != len(f_new.data):
+                    # A different number of traces (e.g. a property type with no
+                    # data that month) can't be patched trace by trace
+                    widget.data = ()
+                    widget.add_traces(f_new.data)
                 with widget.batch_update():
                     if "layout" in update:
                         widget.update_layout(f_new.layout)
+                        if theme is not None:
+                            with reactive.isolate():
+                                widget.update_layout(theme())
                     if "data" in update:
                         for old, new in zip(widget.data, f_new.data):
                             old.update(new)
 
             reactive.get_current_context().on_invalidate(update_plotly_data.destroy)
 
+            if theme is not None:
+
+                @reactive.Effect
+                def update_plotly_theme():
+                    patch = theme()
+                    with widget.batch_update():
+                        widget.update_layout(patch)
+
+                reactive.get_current_context().on_invalidate(update_plotly_theme.destroy)
+
             return widget
 
         return wrapper